@@ -1,6 +1,10 @@
 import streamlit as st
-import re
-from collections import defaultdict
+import time
+
+from cache import LRUCache
+from contextbot import NLPChatBot
+
+_rerun_start = time.perf_counter()
 
 # ✅ Streamlit configuration
 st.set_page_config(
@@ -36,64 +40,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class NLPChatBot:
-    def __init__(self):
-        # Context words for bank disambiguation
-        self.river_context = {'river', 'water', 'stream', 'sit', 'sitting', 'near', 'by', 'side'}
-        self.bank_context = {'money', 'account', 'deposit', 'withdraw', 'loan', 'financial'}
-        
-        # POS tagging rules
-        self.pronouns = {'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her'}
-        self.prepositions = {'in', 'on', 'at', 'by', 'for', 'with', 'about', 'to', 'from', 'of', 'near'}
-        self.be_verbs = {'am', 'is', 'are', 'was', 'were'}
-    
-    def tokenize(self, text):
-        """Simple regex tokenizer that doesn't require NLTK"""
-        return re.findall(r"\w+(?:'\w+)?|\S", text)
-    
-    def pos_tag(self, tokens):
-        """Rule-based POS tagger"""
-        pos_tags = []
-        for i, token in enumerate(tokens):
-            lower_token = token.lower()
-            
-            # Determine POS tag
-            if lower_token in self.pronouns:
-                pos_tags.append((token, 'PRP'))
-            elif lower_token in self.be_verbs:
-                pos_tags.append((token, 'VBP'))
-            elif lower_token in self.prepositions:
-                pos_tags.append((token, 'IN'))
-            elif token.endswith('ing'):
-                pos_tags.append((token, 'VBG'))
-            elif token.lower() == 'bank':
-                pos_tags.append((token, 'NN'))
-            else:
-                # Default to noun
-                pos_tags.append((token, 'NN'))
-        return pos_tags
-    
-    def disambiguate_bank(self, tokens):
-        """Determine if bank is river or financial"""
-        context_words = set(token.lower() for token in tokens)
-        
-        river_matches = len(context_words & self.river_context)
-        bank_matches = len(context_words & self.bank_context)
-        
-        if river_matches > bank_matches:
-            return "🌊 Sloping land beside a body of water (river bank)"
-        else:
-            return "🏦 Financial institution (money bank)"
-    
-    def generate_response(self, bank_sense):
-        """Generate appropriate response"""
-        if "river" in bank_sense:
-            return "🌊 Yes, riverbanks are beautiful places to relax!"
-        else:
-            return "🏦 Are you discussing financial matters?"
+# ♻️ Process-wide resources, shared by every session and rerun.
+# Bump RESOURCE_VERSION when the bot's data changes to invalidate them; it is
+# passed explicitly because st.cache_resource keys on the arguments given,
+# not on default values.
+RESOURCE_VERSION = 3
 
-# Initialize the bot
-bot = NLPChatBot()
+@st.cache_resource
+def load_bot(version):
+    """Build the NLPChatBot once per process (and per resource version)"""
+    return NLPChatBot()
+
+@st.cache_resource
+def load_analysis_cache(version):
+    """Analysis results keyed on whitespace-normalized input, shared by all sessions"""
+    return LRUCache(max_entries=512, ttl=15 * 60)
+
+bot = load_bot(RESOURCE_VERSION)
+analysis_cache = load_analysis_cache(RESOURCE_VERSION)
 
 # Streamlit UI
 st.title("🧠 NLP ContextBot Pro")
@@ -102,17 +66,9 @@ st.markdown("This version uses a self-contained tokenizer and POS tagger with no
 user_input = st.text_input("💬 You:", "I am sitting near river bank")
 
 if user_input:
-    # Process input
-    tokens = bot.tokenize(user_input)
-    pos_tags = bot.pos_tag(tokens)
-    
-    # Word sense disambiguation
-    senses = {}
-    if 'bank' in [token.lower() for token in tokens]:
-        senses['bank'] = bot.disambiguate_bank(tokens)
-    
-    # Generate response
-    response = bot.generate_response(senses.get('bank', ''))
+    # Process input (reruns with unchanged text are served from the cache)
+    key = ' '.join(user_input.split())
+    pos_tags, senses, response = analysis_cache.get_or_compute(key, bot.analyze)
     
     # Display results
     st.markdown("### 🔠 POS Tags")
@@ -124,4 +80,22 @@ if user_input:
             st.markdown(f"**{word}**: {sense}")
     
     st.markdown("### 🤖 Response")
-    st.markdown(f"<div class='bot-response'>{response}</div>", unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(f"<div class='bot-response'>{response}</div>", unsafe_allow_html=True)
+
+# ⚙️ Runtime info
+with st.sidebar:
+    st.markdown("### ⚙️ Runtime")
+    st.caption(f"Resource version: {RESOURCE_VERSION}")
+    if st.button("🔄 Reload models"):
+        load_bot.clear()
+        load_analysis_cache.clear()
+        st.rerun()
+    st.caption(f"Rerun time: {(time.perf_counter() - _rerun_start) * 1000:.1f} ms")
+
+    st.markdown("### 📊 Analysis cache")
+    stats = analysis_cache.stats()
+    col1, col2 = st.columns(2)
+    col1.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+    col2.metric("Entries", f"{stats['entries']}/{analysis_cache.max_entries}")
+    st.caption(f"{stats['hits']} hits · {stats['misses']} misses · "
+               f"{stats['evictions']} evicted · {stats['expirations']} expired")
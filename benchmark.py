@@ -0,0 +1,792 @@
+"""Benchmarks for the ContextBot pipelines.
+
+Usage: python benchmark.py <name> [--size N] [--repeat R] [--workers W] [--clients C]
+
+`python benchmark.py stages --json results.json` is the regression suite:
+every stage of both pipelines, cold and warm, with memory high-water marks.
+"""
+import argparse
+import os
+import time
+
+SAMPLE_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_chat.txt')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under ``name``"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def load_corpus(size, path=SAMPLE_CORPUS):
+    """Return ``size`` utterances, cycling through the sample corpus"""
+    with open(path, encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return [lines[i % len(lines)] for i in range(size)]
+
+
+def timed(func, *args, repeat=1):
+    """Best wall-clock time of ``repeat`` calls, plus the last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def uncached(func):
+    """``func`` with project's lesk result cache emptied before every call"""
+    import project
+
+    def call(*args):
+        project.lesk_cache.clear()
+        return func(*args)
+    return call
+
+
+@benchmark('batch')
+def bench_batch(args):
+    """process_input in a loop vs process_batch, on the sample corpus and on distinct texts"""
+    import project
+
+    corpora = {'sample': load_corpus(args.size), 'synthetic': synthetic_corpus(args.size, seed=args.seed)}
+    for corpus, texts in corpora.items():
+        # The per-utterance loop is slow, so time it on a slice and extrapolate
+        loop_texts = texts[:max(1, args.size // 10)]
+        loop_time, _ = timed(lambda: [project.process_input(t) for t in loop_texts], repeat=args.repeat)
+        batch_time, _ = timed(project.process_batch, texts, repeat=args.repeat)
+
+        loop_rate = len(loop_texts) / loop_time
+        batch_rate = len(texts) / batch_time
+        print(f"{corpus} ({len(set(texts))} distinct of {len(texts)} utterances)")
+        print(f"  process_input loop : {loop_rate:10.1f} utterances/s ({len(loop_texts)} utterances)")
+        print(f"  process_batch      : {batch_rate:10.1f} utterances/s ({len(texts)} utterances)")
+        print(f"  speedup            : {batch_rate / loop_rate:10.1f}x")
+
+
+@benchmark('import')
+def bench_import(args):
+    """Cost of `import project` vs the first load() in a fresh interpreter"""
+    import subprocess
+    import sys
+
+    script = ("import time; t0 = time.perf_counter(); import project; t1 = time.perf_counter(); "
+              "project.load(); t2 = time.perf_counter(); print(t1 - t0, t2 - t1)")
+    runs = [subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+            for _ in range(args.repeat)]
+    import_time = min(float(run[0]) for run in runs)
+    load_time = min(float(run[1]) for run in runs)
+    print(f"import project : {1000 * import_time:8.1f} ms")
+    print(f"first load()   : {1000 * load_time:8.1f} ms")
+
+
+@benchmark('parallel')
+def bench_parallel(args):
+    """process_batch vs process_parallel at 1, 2, 4, ... workers (pool startup included)"""
+    import project
+
+    project.init_worker()  # load WordNet before timing anything
+    texts = load_corpus(args.size)
+    batch_time, expected = timed(project.process_batch, texts, repeat=args.repeat)
+    print(f"process_batch         : {len(texts) / batch_time:10.1f} utterances/s")
+    max_workers = args.workers or os.cpu_count()
+    workers = 1
+    while True:
+        elapsed, results = timed(project.process_parallel, texts, workers, args.chunksize, repeat=args.repeat)
+        assert results == expected
+        print(f"process_parallel x{workers:<3} : {len(texts) / elapsed:10.1f} utterances/s "
+              f"({batch_time / elapsed:.2f}x)")
+        if workers >= max_workers:
+            break
+        workers = min(2 * workers, max_workers)
+
+
+@benchmark('lesk')
+def bench_lesk(args):
+    """nltk.wsd.lesk vs the precomputed signature index, per token"""
+    from nltk import pos_tag, word_tokenize
+    from nltk.wsd import lesk
+
+    import project
+
+    project.load()
+    if project.wsd_index is None:
+        raise SystemExit("no Lesk index; run 'python resources.py' first")
+    tagged = [pos_tag(word_tokenize(text)) for text in load_corpus(max(1, args.size // 10))]
+    queries = [([w for w, _ in tags], word, project.get_wordnet_pos(tag))
+               for tags in tagged for word, tag in tags]
+
+    nltk_time, _ = timed(lambda: [lesk(c, w, pos=p) for c, w, p in queries], repeat=args.repeat)
+    index_time, _ = timed(lambda: [project.wsd_index.lesk(c, w, pos=p) for c, w, p in queries],
+                          repeat=args.repeat)
+    print(f"nltk lesk  : {1e6 * nltk_time / len(queries):8.1f} us/token ({len(queries)} tokens)")
+    print(f"lesk index : {1e6 * index_time / len(queries):8.1f} us/token")
+    print(f"speedup    : {nltk_time / index_time:8.1f}x")
+
+
+@benchmark('metrics')
+def bench_metrics(args):
+    """process_input with the metrics registry disabled vs enabled"""
+    import metrics
+    import project
+
+    texts = load_corpus(args.size)
+    [project.process_input(text) for text in texts]  # warm the caches
+    enabled = metrics.registry.enabled
+    try:
+        for state in (False, True):
+            metrics.registry.enabled = state
+            elapsed, _ = timed(lambda: [project.process_input(text) for text in texts], repeat=args.repeat)
+            print(f"metrics {'enabled ' if state else 'disabled'}: {1e6 * elapsed / len(texts):8.1f} us/message")
+    finally:
+        metrics.registry.enabled = enabled
+        metrics.registry.clear()
+
+
+@benchmark('wsd-cache')
+def bench_wsd_cache(args):
+    """Lesk result cache: hit rate and disambiguate() time, uncached vs cached, per backend"""
+    import tempfile
+
+    import project
+    import wordnet_lite
+    import wsd_cache
+
+    project.load()
+    corpora = {'sample': load_corpus(args.size), 'synthetic': synthetic_corpus(args.size, seed=args.seed)}
+    backends = {'lesk index': project.wsd_index, 'wordnet_lite': project.wordnet or wordnet_lite.load()}
+    saved_index, saved_cache = project.wsd_index, project.lesk_cache
+    try:
+        for backend_name, backend in backends.items():
+            if backend is None:
+                continue
+            project.wsd_index = backend
+            for corpus, texts in corpora.items():
+                analyzed = [(words, project.pos_tag(words))
+                            for words in ([t.corrected for t in project.tokenize(text)] for text in texts)]
+                vocab = getattr(backend, 'vocab', None)
+                run = lambda: [project.disambiguate(w, t) for w, t in analyzed]
+                project.lesk_cache = wsd_cache.WSDCache(max_entries=0, path=None, vocab=vocab)  # never hits
+                uncached_time, _ = timed(run, repeat=args.repeat)
+                project.lesk_cache = wsd_cache.WSDCache(path=None, vocab=vocab)
+                cold_time, _ = timed(run)
+                hit_rate = project.lesk_cache.stats()['hit_rate']
+                warm_time, _ = timed(run, repeat=args.repeat)
+                print(f"{backend_name:12} {corpus:9}: first pass hit rate {100 * hit_rate:5.1f}%; us/message "
+                      f"no cache {1e6 * uncached_time / len(texts):7.1f}, first pass {1e6 * cold_time / len(texts):7.1f}, "
+                      f"warm {1e6 * warm_time / len(texts):7.1f}")
+
+        # A second process (here: a second cache) starts warm from the shared database
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'wsd.sqlite')
+            analyzed = [(words, project.pos_tag(words))
+                        for words in ([t.corrected for t in project.tokenize(text)] for text in corpora['sample'])]
+            project.wsd_index = saved_index
+            for label in ('writer', 'reader'):
+                project.lesk_cache = wsd_cache.WSDCache(path=path, vocab=getattr(saved_index, 'vocab', None))
+                elapsed, _ = timed(lambda: [project.disambiguate(w, t) for w, t in analyzed])
+                project.lesk_cache.flush()
+                stats = project.lesk_cache.stats()
+                print(f"sqlite {label}: {stats['disk_hits']} disk hits, hit rate {100 * stats['hit_rate']:5.1f}%, "
+                      f"{1e6 * elapsed / len(analyzed):8.1f} us/message")
+                project.lesk_cache._db.close()
+    finally:
+        project.wsd_index, project.lesk_cache = saved_index, saved_cache
+
+
+def retained(build):
+    """(result, bytes still allocated once ``build()`` returns)"""
+    import tracemalloc
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, after - before
+
+
+@benchmark('columnar')
+def bench_columnar(args):
+    """Interned-ID columns vs lists of (word, tag) tuples: bytes per token and throughput"""
+    import project
+    from columnar import Columns
+    from contextbot import NLPChatBot
+
+    texts = load_corpus(args.size) + synthetic_corpus(args.size, seed=args.seed)
+    bot = NLPChatBot()
+    tagged, tuple_bytes = retained(lambda: [bot.pos_tag(bot.tokenize(text)) for text in texts])
+    columns, column_bytes = retained(lambda: bot.analyze_batch(texts)[0])
+    tokens = len(columns.token_ids)
+    assert columns.to_tuples() == tagged
+    print(f"tokens                 : {tokens} in {len(texts)} messages, {len(bot.vocabulary)} distinct")
+    print(f"(word, tag) tuple lists: {tuple_bytes / tokens:8.1f} bytes/token")
+    print(f"columns + vocabulary   : {column_bytes / tokens:8.1f} bytes/token "
+          f"({columns.nbytes / tokens:.1f} in the arrays)")
+
+    def tuple_pipeline():
+        tags = [bot.pos_tag(bot.tokenize(text)) for text in texts]
+        senses = bot.disambiguate_batch(texts)
+        return tags, senses, [bot.generate_response(s.get('bank', '')) for s in senses]
+
+    tag_time, _ = timed(lambda: [bot.pos_tag(bot.tokenize(text)) for text in texts], repeat=args.repeat)
+    column_tag_time, _ = timed(lambda: bot.pos_tag_columns(bot.encode(texts)), repeat=args.repeat)
+    full_time, _ = timed(tuple_pipeline, repeat=args.repeat)
+    column_full_time, _ = timed(bot.analyze_batch, texts, repeat=args.repeat)
+    print(f"tokenize + tag, tuples : {tokens / tag_time:12.0f} tokens/s")
+    print(f"tokenize + tag, columns: {tokens / column_tag_time:12.0f} tokens/s")
+    print(f"tag + WSD + response, tuples : {len(texts) / full_time:10.0f} messages/s")
+    print(f"tag + WSD + response, columns: {len(texts) / column_full_time:10.0f} messages/s")
+
+    # project.py keeps nltk's tuple output, but it can be stored columnar
+    # (the tuple copy shares its strings, so only tuples and lists count)
+    nltk_tagged = [tags for _, tags, _ in project.process_batch(texts)]
+    _, nltk_bytes = retained(lambda: [[(w, t) for w, t in sentence] for sentence in nltk_tagged])
+    stored, stored_bytes = retained(lambda: Columns.from_tuples(nltk_tagged))
+    nltk_tokens = len(stored.token_ids)
+    print(f"project tags as tuples : {nltk_bytes / nltk_tokens:8.1f} bytes/token (strings not counted)")
+    print(f"project tags as columns: {stored_bytes / nltk_tokens:8.1f} bytes/token")
+
+
+@benchmark('wordnet')
+def bench_wordnet(args):
+    """First lesk call and peak RSS in a fresh process: nltk's WordNet vs wordnet_lite vs the lesk index"""
+    import subprocess
+    import sys
+
+    setup = ("import resource, time; import resources; resources.ensure_resources(); "
+             "context = 'I need to deposit money at the bank'.split(); ")
+    scripts = {
+        "nltk lesk": setup + ("from nltk.wsd import lesk; t = time.perf_counter(); "
+                              "lesk(context, 'bank', 'n')"),
+        "wordnet_lite": setup + ("import wordnet_lite; t = time.perf_counter(); "
+                                 "wordnet_lite.load().lesk(context, 'bank', 'n')"),
+        "lesk index": setup + ("import lesk_index; t = time.perf_counter(); "
+                               "lesk_index.load().lesk(context, 'bank', 'n')"),
+    }
+    for label, script in scripts.items():
+        script += "; print(time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+        runs = [subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+                for _ in range(args.repeat)]
+        elapsed = min(float(run[0]) for run in runs)
+        rss = min(int(run[1]) for run in runs)
+        print(f"{label:13}: first noun lookup {1000 * elapsed:8.1f} ms, peak RSS {rss / 1024:6.1f} MB")
+
+
+@benchmark('spell')
+def bench_spell(args):
+    """Correction latency per word: SpellChecker vs the SymSpell index (uncached)"""
+    import symspell
+    from spellchecker import SpellChecker
+
+    index = symspell.load()
+    if index is None:
+        print(f"building {symspell.DEFAULT_PATH}")
+        symspell.build()
+        index = symspell.load()
+    typos = symspell.typo_list(max(10, args.size // 20), seed=args.seed)
+    known = [word for text in load_corpus(args.size) for word in text.lower().split() if word in index]
+
+    load_time, spell = timed(SpellChecker)
+    open_time, _ = timed(symspell.SymSpell, index.path)
+    print(f"SpellChecker()  : {1000 * load_time:8.1f} ms")
+    print(f"SymSpell(path)  : {1000 * open_time:8.1f} ms")
+    for label, words, repeat in (('misspelled', typos, 1), ('known', known, args.repeat)):
+        spell_time, expected = timed(lambda: [spell.correction(w) for w in words], repeat=repeat)
+        index_time, got = timed(lambda: [index.correction(w) for w in words], repeat=args.repeat)
+        print(f"{label:10} x{len(words):6}: SpellChecker {1e6 * spell_time / len(words):10.1f} us/word, "
+              f"SymSpell {1e6 * index_time / len(words):7.1f} us/word, "
+              f"{sum(e != g for e, g in zip(expected, got))} differences")
+
+
+def _legacy_make_tokens(text, words):
+    # project._make_tokens before the token pre-pass, kept as the baseline
+    import project
+
+    tokens, cursor = [], 0
+    for word in words:
+        start, end = project._token_span(text, word, cursor)
+        if word in project.spell:
+            fixed = word
+        else:
+            fixed = project.spell_cache.get_or_compute(word, project.spell.correction) or word
+        tokens.append(project.Token(word, fixed, start, end))
+        cursor = end
+    return tokens
+
+
+@benchmark('token-classes')
+def bench_token_classes(args):
+    """Share of tokens the spelling pre-pass keeps from the spelling backend, and its cost"""
+    from collections import Counter
+
+    import project
+
+    project.load()
+    extra = ["see http://example.com/a?b=1 or mail me@example.org", "it's 3,000 km, ½ of it by node.js 😀 #travel"]
+    corpora = {'sample': load_corpus(args.size), 'synthetic': synthetic_corpus(args.size, seed=args.seed),
+               'mixed': [text for text in load_corpus(args.size // 2) for text in (text, extra[len(text) % 2])]}
+    for corpus, texts in corpora.items():
+        tokenized = [(text, project.word_tokenize(text)) for text in texts]
+        classes = Counter(kind for text, words in tokenized for *_, kind in project.classify_tokens(text, words))
+        total = sum(classes.values())
+        shares = ', '.join(f"{name} {classes[name] / total:.1%}" for name in project.TOKEN_CLASSES)
+        print(f"{corpus:9}: {total} tokens, {1 - classes['oov'] / total:.1%} short-circuited ({shares})")
+        for label, make_tokens in (('without pre-pass', _legacy_make_tokens), ('with pre-pass', project._make_tokens)):
+            project.spell_cache.clear()
+            cold_time, _ = timed(lambda: [make_tokens(text, words) for text, words in tokenized])
+            warm_time, _ = timed(lambda: [make_tokens(text, words) for text, words in tokenized], repeat=args.repeat)
+            print(f"  {label:16}: {1e6 * cold_time / total:8.2f} us/token cold cache, "
+                  f"{1e6 * warm_time / total:6.2f} us/token warm")
+
+
+@benchmark('wsd-filter')
+def bench_wsd_filter(args):
+    """disambiguate() with and without the content-word filter"""
+    import project
+
+    project.load()
+    analyzed = [(words, project.pos_tag(words))
+                for words in ([t.corrected for t in project.tokenize(text)]
+                              for text in load_corpus(args.size))]
+    tokens = sum(len(tags) for _, tags in analyzed)
+    content = sum(project.is_content_word(w, t) for _, tags in analyzed for w, t in tags)
+
+    all_time, _ = timed(uncached(lambda: [project.disambiguate(w, t, word_filter=None) for w, t in analyzed]),
+                        repeat=args.repeat)
+    filtered_time, _ = timed(uncached(lambda: [project.disambiguate(w, t) for w, t in analyzed]),
+                             repeat=args.repeat)
+    print(f"tokens            : {tokens}")
+    print(f"lesk calls avoided: {tokens - content} ({100 * (tokens - content) / tokens:.1f}%)")
+    print(f"every token       : {all_time:8.3f}s")
+    print(f"content words only: {filtered_time:8.3f}s ({all_time / filtered_time:.1f}x faster)")
+
+
+@benchmark('rerun')
+def bench_rerun(args):
+    """Streamlit rerun time of app.py, and what building the bot per rerun cost"""
+    from streamlit.testing.v1 import AppTest
+
+    from contextbot import NLPChatBot
+
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    at = AppTest.from_file(app_path)
+    cold_time, _ = timed(at.run)
+    reruns = max(1, args.size // 100)
+    warm_time, _ = timed(lambda: [at.run() for _ in range(reruns)], repeat=args.repeat)
+    build_time, _ = timed(lambda: [NLPChatBot() for _ in range(reruns)], repeat=args.repeat)
+    print(f"first run                  : {1000 * cold_time:8.2f} ms")
+    print(f"cached rerun               : {1000 * warm_time / reruns:8.2f} ms")
+    print(f"NLPChatBot() per rerun (old): {1000 * build_time / reruns:8.2f} ms")
+
+
+def _legacy_pos_tag(bot, tokens):
+    # NLPChatBot.pos_tag before the lexicon table, kept as the baseline
+    pos_tags = []
+    for token in tokens:
+        lower_token = token.lower()
+        if lower_token in bot.pronouns:
+            pos_tags.append((token, 'PRP'))
+        elif lower_token in bot.be_verbs:
+            pos_tags.append((token, 'VBP'))
+        elif lower_token in bot.prepositions:
+            pos_tags.append((token, 'IN'))
+        elif token.endswith('ing'):
+            pos_tags.append((token, 'VBG'))
+        elif token.lower() == 'bank':
+            pos_tags.append((token, 'NN'))
+        else:
+            pos_tags.append((token, 'NN'))
+    return pos_tags
+
+
+@benchmark('pos-tag')
+def bench_pos_tag(args):
+    """NLPChatBot.pos_tag vs the old if/elif tagger, tokens per second"""
+    from contextbot import NLPChatBot
+
+    bot = NLPChatBot()
+    tokens = [t for text in load_corpus(args.size) for t in bot.tokenize(text)]
+    words = [t.text for t in tokens]
+    assert _legacy_pos_tag(bot, words) == bot.pos_tag(tokens)
+
+    legacy_time, _ = timed(_legacy_pos_tag, bot, words, repeat=args.repeat)
+    table_time, _ = timed(bot.pos_tag, tokens, repeat=args.repeat)
+    print(f"if/elif tagger : {len(tokens) / legacy_time:12.0f} tokens/s")
+    print(f"lexicon tagger : {len(tokens) / table_time:12.0f} tokens/s")
+    print(f"speedup        : {legacy_time / table_time:12.1f}x")
+
+
+def _legacy_generate_response(corrected, senses):
+    # project.generate_response before the rule engine, kept as the baseline
+    if "bank" in corrected:
+        meaning = senses.get("bank", "")
+        if "financial" in meaning or "money" in meaning:
+            return "Are you talking about a financial institution?"
+        elif "river" in meaning:
+            return "Oh! You mean a river bank. Sounds peaceful."
+        else:
+            return "Which type of bank are you referring to?"
+    elif "book" in corrected:
+        return "Books are a great source of knowledge!"
+    elif "love" in corrected:
+        return "Love is a beautiful emotion. Tell me more!"
+    else:
+        return "Thanks for sharing! What else would you like to talk about?"
+
+
+@benchmark('responses')
+def bench_responses(args):
+    """Response rules vs the old if/elif chain, and as the rule set grows"""
+    import random
+
+    from contextbot import NLPChatBot
+    from project import RESPONSES_PATH
+    from rules import ResponseRules
+
+    bot = NLPChatBot()
+    messages = []
+    for text in load_corpus(args.size):
+        tokens = [t.lower for t in bot.tokenize(text)]
+        messages.append((' '.join(tokens), tokens, bot.disambiguate(bot.tokenize(text))))
+    engine = ResponseRules.load(RESPONSES_PATH)
+    legacy_time, _ = timed(lambda: [_legacy_generate_response(c, s) for c, _, s in messages], repeat=args.repeat)
+    engine_time, _ = timed(lambda: [engine.respond(t, s) for _, t, s in messages], repeat=args.repeat)
+    print(f"if/elif chain ({len(engine)} rules): {1e6 * legacy_time / len(messages):8.2f} us/message")
+    print(f"rule engine   ({len(engine)} rules): {1e6 * engine_time / len(messages):8.2f} us/message")
+
+    # Synthetic rule sets: one trigger word each, some of them in every message
+    rng = random.Random(args.seed)
+    for n_rules in (100, 1000, 10000):
+        spec = {'default': '', 'rules': [{'triggers': [f"kw{i}x"], 'response': str(i)} for i in range(n_rules)]}
+        engine = ResponseRules(spec)
+        triggers = [rule['triggers'][0] for rule in spec['rules']]
+        texts = [tokens + [rng.choice(triggers)] for _, tokens, _ in messages]
+        joined = [' '.join(tokens) for tokens in texts]
+
+        # The substring scan an if/elif chain of that length amounts to, on a tenth of the messages
+        sample = joined[:max(1, len(joined) // 10)]
+        chain_time, _ = timed(lambda: [next((i for i, trigger in enumerate(triggers) if trigger in text), None)
+                                       for text in sample], repeat=args.repeat)
+        engine_time, _ = timed(lambda: [engine.respond(tokens) for tokens in texts], repeat=args.repeat)
+        print(f"{n_rules:6d} rules: substring chain {1e6 * chain_time / len(sample):10.2f} us/message, "
+              f"rule engine {1e6 * engine_time / len(texts):8.2f} us/message")
+
+
+def synthetic_inventory(lemmas, words, senses=3, context=8, seed=0):
+    """Random sense inventory in the data/senses.json format whose context words come from ``words``"""
+    import random
+
+    rng = random.Random(seed)
+    words = sorted(set(words))
+    return {f"lemma{i}": {'senses': [{'label': f"s{j}", 'gloss': f"lemma{i} sense {j}",
+                                       'context': rng.sample(words, min(context, len(words)))}
+                                      for j in range(senses)]}
+            for i in range(lemmas)}
+
+
+@benchmark('senses')
+def bench_senses(args):
+    """Per-message sense scoring cost as the inventory grows.
+
+    The synthetic lemmas are added to the real inventory and draw their
+    context words from the corpus, so every message has lemmas to score and
+    its words are shared with thousands of other lemmas' profiles.
+    """
+    import json
+
+    from contextbot import NLPChatBot
+    from senses import SENSES_PATH, SenseInventory
+
+    bot = NLPChatBot()
+    messages = [[t.lower for t in bot.tokenize(text)] for text in load_corpus(args.size)]
+    with open(SENSES_PATH, encoding='utf-8') as f:
+        base = json.load(f)
+    vocabulary = [word for message in messages for word in message]
+    for lemmas in (0, 1000, 10000):
+        inventory = SenseInventory({**base, **synthetic_inventory(lemmas, vocabulary)})
+        ambiguous = sum(bool(inventory.disambiguate(m)) for m in messages)
+        elapsed, _ = timed(lambda: [inventory.disambiguate(m) for m in messages], repeat=args.repeat)
+        print(f"{len(inventory):6d} lemmas: {1e6 * elapsed / len(messages):8.2f} us/message "
+              f"({ambiguous} of {len(messages)} messages with ambiguous words)")
+
+
+@benchmark('sense-vectors')
+def bench_sense_vectors(args):
+    """Vectorized sense scoring on synthetic batches (use --size up to 1000000)"""
+    import random
+
+    from contextbot import NLPChatBot
+    from sense_vectors import VectorSenseScorer
+
+    inventory = NLPChatBot().sense_inventory
+    scorer = VectorSenseScorer(inventory)
+    rng = random.Random(0)
+    words = list(inventory.index) + list(inventory.forms) + [f"filler{i}" for i in range(2000)]
+    messages = [rng.sample(words, 12) for _ in range(args.size)]
+
+    encode_time, encoded = timed(scorer.encode, messages)
+    batch_time, _ = timed(scorer.score_batch, messages, repeat=args.repeat)
+    loop = messages[:max(1, args.size // 10)]
+    loop_time, _ = timed(lambda: [inventory.disambiguate(m) for m in loop], repeat=args.repeat)
+    print(f"messages            : {len(messages)} ({len(encoded[2])} ambiguous words)")
+    print(f"encode only         : {len(messages) / encode_time:12.0f} messages/s")
+    print(f"score_batch         : {len(messages) / batch_time:12.0f} messages/s")
+    print(f"per-message counting: {len(loop) / loop_time:12.0f} messages/s")
+
+
+@benchmark('window')
+def bench_window(args):
+    """Whole-message vs windowed WSD context on multi-kilobyte inputs"""
+    from contextbot import NLPChatBot
+
+    lines = load_corpus(400)
+    for kilobytes in (1, 4, 16):
+        text = ''
+        while len(text) < kilobytes * 1024:
+            text += lines[len(text) % len(lines)] + '. '
+        for window in (None, 10):
+            bot = NLPChatBot(context_window=window)
+            tokens = bot.tokenize(text)
+            elapsed, _ = timed(bot.disambiguate, tokens, repeat=args.repeat)
+            label = 'whole message' if window is None else f"window ±{window}"
+            print(f"contextbot {kilobytes:2d} KB {label:14}: {1000 * elapsed:8.2f} ms")
+
+    import project
+
+    for kilobytes in (1, 4):
+        text = ' '.join(lines)[:kilobytes * 1024]
+        words = [t.corrected for t in project.tokenize(text)]
+        tags = project.pos_tag(words)
+        for window in (None, 10):
+            elapsed, _ = timed(uncached(project.disambiguate), words, tags, None, project.is_content_word, window,
+                               repeat=args.repeat)
+            label = 'whole message' if window is None else f"window ±{window}"
+            print(f"lesk       {kilobytes:2d} KB {label:14}: {1000 * elapsed:8.2f} ms")
+
+
+async def _chat_client(host, port, texts, latencies):
+    # Stand-in client: one keep-alive connection posting messages in sequence
+    import asyncio
+    import json
+
+    reader, writer = await asyncio.open_connection(host, port)
+    session = None
+    for text in texts:
+        body = json.dumps({'text': text, 'session': session}).encode('utf-8')
+        start = time.perf_counter()
+        writer.write(b"POST /chat HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        await writer.drain()
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        session = json.loads(await reader.readexactly(length))['session']
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+@benchmark('server')
+def bench_server(args):
+    """p50/p99 latency of server.py under concurrent stand-in clients"""
+    import asyncio
+
+    from server import ChatServer
+
+    async def run():
+        server = ChatServer(args.workers)
+        listener = await server.start('127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        texts = load_corpus(args.size)
+        latencies = []
+        per_client = max(1, len(texts) // args.clients)
+        start = time.perf_counter()
+        await asyncio.gather(*(_chat_client('127.0.0.1', port, texts[i::args.clients][:per_client], latencies)
+                               for i in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        listener.close()
+        await listener.wait_closed()
+        server.close()
+        return latencies, elapsed
+
+    latencies, elapsed = asyncio.run(run())
+    print(f"requests   : {len(latencies)} from {args.clients} concurrent clients")
+    print(f"throughput : {len(latencies) / elapsed:8.1f} requests/s")
+    print(f"p50        : {1000 * percentile(latencies, 50):8.2f} ms")
+    print(f"p99        : {1000 * percentile(latencies, 99):8.2f} ms")
+
+
+def synthetic_corpus(size, seed=0, typo_rate=0.1):
+    """``size`` reproducible chat-like utterances over the sample corpus vocabulary, with typos"""
+    import random
+
+    rng = random.Random(seed)
+    vocab = sorted({word for line in load_corpus(40) for word in line.split()})
+    texts = []
+    for _ in range(size):
+        words = rng.choices(vocab, k=rng.randint(4, 20))
+        for i, word in enumerate(words):
+            if len(word) > 3 and rng.random() < typo_rate:
+                j = rng.randrange(len(word) - 1)
+                words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+        texts.append(' '.join(words))
+    return texts
+
+
+# Per-stage chains: (stage, function of (pipeline object, state)); each
+# stage's result is stored in the state under its name for the next ones
+PIPELINE_STAGES = {
+    'contextbot': [
+        ('tokenize', lambda bot, s: bot.tokenize(s['text'])),
+        ('pos_tag', lambda bot, s: bot.pos_tag(s['tokenize'])),
+        ('disambiguate', lambda bot, s: bot.disambiguate(s['tokenize'])),
+        ('disambiguate_bank', lambda bot, s: bot.disambiguate_bank(s['tokenize'])),
+        ('generate_response', lambda bot, s: bot.generate_response(s['disambiguate_bank'])),
+        ('analyze', lambda bot, s: bot.analyze(s['text'])),
+    ],
+    'project': [
+        ('word_tokenize', lambda project, s: project.word_tokenize(s['text'])),
+        ('correct_spelling', lambda project, s: project.correct_spelling(s['text'])),
+        ('pos_tag', lambda project, s: project.pos_tag(s['correct_spelling'].split())),
+        ('lesk', lambda project, s: project.disambiguate(s['correct_spelling'].split(), s['pos_tag'])),
+        ('generate_response', lambda project, s: project.generate_response(
+            s['correct_spelling'], s['pos_tag'], s['lesk'])),
+        ('process_input', lambda project, s: project.process_input(s['text'])),
+    ],
+}
+
+
+def load_pipeline(pipeline):
+    """The object the stages of ``pipeline`` run against"""
+    if pipeline == 'contextbot':
+        from contextbot import NLPChatBot
+        return NLPChatBot()
+    import project
+    project.load()
+    return project
+
+
+def cold_stages(pipeline, text):
+    """Setup plus the first call of every stage, in this (fresh) process"""
+    import resource
+
+    start = time.perf_counter()
+    obj = load_pipeline(pipeline)
+    timings = {'setup': time.perf_counter() - start}
+    state = {'text': text}
+    for stage, func in PIPELINE_STAGES[pipeline]:
+        start = time.perf_counter()
+        state[stage] = func(obj, state)
+        timings[stage] = time.perf_counter() - start
+    return {'seconds': timings, 'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def run_stages(pipeline, corpus, texts, repeat):
+    """Warm timings and tracemalloc peaks for every stage, plus a cold run in a fresh interpreter.
+
+    Cold rows report the child's peak RSS, warm rows the peak traced
+    allocation of one pass over the corpus (``memory`` says which).
+    """
+    import json
+    import subprocess
+    import sys
+    import tracemalloc
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = ("import json, sys, benchmark; "
+              f"print(json.dumps(benchmark.cold_stages({pipeline!r}, sys.stdin.read())))")
+    child = subprocess.run([sys.executable, '-c', script], input=texts[0], capture_output=True,
+                           text=True, check=True, cwd=here)
+    cold = json.loads(child.stdout)
+    rows = [{'pipeline': pipeline, 'corpus': corpus, 'stage': stage, 'mode': 'cold', 'items': 1,
+             'seconds': seconds, 'peak_bytes': cold['max_rss_bytes'], 'memory': 'rss'}
+            for stage, seconds in cold['seconds'].items()]
+
+    # One pass through the chain builds every stage's input (and warms caches)
+    obj = load_pipeline(pipeline)
+    states = []
+    for text in texts:
+        state = {'text': text}
+        for stage, func in PIPELINE_STAGES[pipeline]:
+            state[stage] = func(obj, state)
+        states.append(state)
+
+    for stage, func in PIPELINE_STAGES[pipeline]:
+        seconds, _ = timed(lambda: [func(obj, state) for state in states], repeat=repeat)
+        tracemalloc.start()
+        results = [func(obj, state) for state in states]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del results
+        rows.append({'pipeline': pipeline, 'corpus': corpus, 'stage': stage, 'mode': 'warm',
+                     'items': len(states), 'seconds': seconds, 'peak_bytes': peak, 'memory': 'traced'})
+    return rows
+
+
+@benchmark('stages')
+def bench_stages(args):
+    """Per-stage cold/warm timings and memory peaks for both pipelines (offline)"""
+    import json
+    import platform
+    import subprocess
+    from importlib.metadata import version
+
+    # Never touch the network: missing NLTK data is an error, not a download
+    os.environ['CONTEXTBOT_OFFLINE'] = '1'
+    corpora = {'sample': load_corpus(args.size), 'synthetic': synthetic_corpus(args.size, seed=args.seed)}
+    rows = []
+    for pipeline in PIPELINE_STAGES:
+        for corpus, texts in corpora.items():
+            rows.extend(run_stages(pipeline, corpus, texts, args.repeat))
+
+    if args.json:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        report = {
+            'meta': {'commit': commit or None, 'python': platform.python_version(),
+                     'platform': platform.platform(), 'nltk': version('nltk'), 'size': args.size, 'repeat': args.repeat,
+                     'seed': args.seed},
+            'results': rows,
+        }
+        if args.json == '-':
+            print(json.dumps(report, indent=2))
+            return
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{'pipeline':10} {'corpus':9} {'stage':17} {'mode':4} {'us/item':>11} {'peak KB':>10} memory")
+    for row in rows:
+        print(f"{row['pipeline']:10} {row['corpus']:9} {row['stage']:17} {row['mode']:4} "
+              f"{1e6 * row['seconds'] / row['items']:11.1f} {row['peak_bytes'] / 1024:10.1f} {row['memory']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('--size', type=int, default=2000, help="number of utterances")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=256, help="utterances per task for 'parallel'")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent clients for 'server'")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic corpora")
+    parser.add_argument('--json', metavar='PATH', help="also write 'stages' results as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Small thread-safe LRU cache used for memoizing pipeline stages."""
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _sizeof(key, value):
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUCache:
+    """Bounded LRU mapping with hit/miss counters.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or the approximate ``max_bytes`` budget is exceeded, and expire ``ttl``
+    seconds after they were stored when a ttl is given (len(), ``in`` and
+    stats() count only live entries).  If ``path`` is given the cache is
+    loaded from it on construction and ``save()`` writes it back as JSON, so
+    keys and values must be JSON-serializable.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None, path=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._bytes = 0
+        self._data = OrderedDict()
+        self._expires = OrderedDict()  # key -> expiry time, soonest first
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._expire()
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._expires[key] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key, value):
+        if key in self._data:
+            self._bytes -= _sizeof(key, self._data[key])
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._bytes += _sizeof(key, value)
+        if self.ttl is not None:
+            self._expires[key] = time.monotonic() + self.ttl
+            self._expires.move_to_end(key)
+        while self._data and (len(self._data) > self.max_entries or
+                              (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _expire(self):
+        # Every entry gets the same ttl, so _expires is in expiry order
+        now = time.monotonic()
+        while self._expires:
+            key, expires = next(iter(self._expires.items()))
+            if expires > now:
+                break
+            self._remove(key)
+            self.expirations += 1
+
+    def _remove(self, key):
+        self._bytes -= _sizeof(key, self._data.pop(key))
+        self._expires.pop(key, None)
+
+    def get_or_compute(self, key, func):
+        """Return the cached value for ``key``, computing it with func(key) on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = func(key)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def save(self, path=None):
+        """Write the entries (oldest first) to ``path`` as JSON"""
+        path = path or self.path
+        with self._lock:
+            items = list(self._data.items())
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        """Merge entries previously written by save(); unreadable files are ignored.
+
+        Loaded entries get a fresh ttl.
+        """
+        try:
+            with open(path or self.path, encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for key, value in items:
+                self._put(key, value)
@@ -0,0 +1,121 @@
+"""Command-line front end for the project.py pipeline.
+
+    python cli.py                              # interactive chat (same as `python project.py`)
+    python cli.py --stream < chat.log          # one JSON result per input line
+    python cli.py --format jsonl a.jsonl b.jsonl --batch-size 512
+
+The streaming mode reads newline-delimited text (or JSONL objects with a
+"text" field) from stdin or files and writes one JSON object per message
+with the original text, corrected text, POS tags, senses and response.
+Input is read lazily and analyzed ``--batch-size`` messages at a time, so
+memory stays flat however large the input is.
+"""
+import argparse
+import json
+import os
+import sys
+from itertools import islice
+
+import project
+
+DEFAULT_BATCH_SIZE = 256
+
+
+# Main Chat Function
+def chatbot():
+    print("Hello! I'm your context-aware chatbot. Type 'exit' to quit.\n")
+    project.load()
+    while True:
+        user_input = input("You: ")
+        if user_input.lower() == 'exit':
+            print("Bot: Goodbye!")
+            break
+        corrected, pos_tags, senses = project.process_input(user_input)
+        print(f"\n[Corrected]: {corrected}")
+        print(f"[POS Tags]: {pos_tags}")
+        print(f"[Word Senses]: {senses}")
+        response = project.generate_response(corrected, pos_tags, senses)
+        print(f"Bot: {response}\n")
+
+
+# Streaming mode
+def read_messages(paths, fmt='text', field='text'):
+    """Yield the non-blank messages in ``paths`` ('-' is stdin) one at a time"""
+    for path in paths or ['-']:
+        f = sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+        try:
+            for number, line in enumerate(f, 1):
+                text = line.rstrip('\r\n')
+                if fmt == 'jsonl':
+                    if not text.strip():
+                        continue
+                    try:
+                        text = json.loads(text)[field]
+                    except (ValueError, KeyError, TypeError):
+                        text = None
+                    if not isinstance(text, str):
+                        print(f"{path}:{number}: skipped, expected an object with a string {field!r}",
+                              file=sys.stderr)
+                        continue
+                if text.strip():
+                    yield text
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def stream(messages, batch_size=DEFAULT_BATCH_SIZE):
+    """Analyze ``messages`` lazily, ``batch_size`` at a time; yields one result dict each"""
+    for batch in batches(messages, batch_size):
+        for text, (corrected, pos_tags, senses) in zip(batch, project.process_batch(batch)):
+            yield {
+                'text': text,
+                'corrected': corrected,
+                'pos_tags': pos_tags,
+                'senses': senses,
+                'response': project.generate_response(corrected, pos_tags, senses),
+            }
+
+
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, not {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ContextBot command line")
+    parser.add_argument('files', nargs='*', help="input files ('-' for stdin); implies --stream")
+    parser.add_argument('--stream', action='store_true', help="read stdin/files and write JSONL to stdout")
+    parser.add_argument('--format', choices=('text', 'jsonl'), default='text', help="input format")
+    parser.add_argument('--field', default='text', help="JSONL field holding the message")
+    parser.add_argument('--batch-size', type=positive_int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    if not (args.stream or args.files):
+        chatbot()
+        return
+
+    messages = read_messages(args.files, args.format, args.field)
+    try:
+        for result in stream(messages, args.batch_size):
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Output piped into e.g. `head`: silence the flush at exit and stop
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+# Run chatbot
+if __name__ == '__main__':
+    main()
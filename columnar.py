@@ -0,0 +1,124 @@
+"""Columnar form of an analyzed batch: interned IDs in typed arrays.
+
+Instead of a list of token strings per message and a (word, tag) tuple per
+token, a batch is stored as
+
+    token_ids  uint32[tokens]        ids into a shared Vocabulary
+    offsets    int64[messages + 1]   message i is token_ids[offsets[i]:offsets[i + 1]]
+    tag_ids    uint8[tokens]         ids into a tag Vocabulary, once tagged
+
+Every distinct string is stored once, so a token costs 5 bytes rather than
+a str, a tuple and list slots.  Per-token stages become a table with one
+entry per vocabulary string (built once per new string, see extend_table)
+plus a NumPy gather over token_ids.  NLPChatBot.analyze_batch runs its
+tagger, sense scorer and responses this way.
+"""
+from array import array
+
+import numpy as np
+
+
+class Vocabulary:
+    """Interns strings to dense integer ids, in order of first appearance"""
+
+    def __init__(self, strings=()):
+        self.ids = {}
+        self._strings = []
+        self.intern_all(strings)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, string):
+        ids = self.ids
+        return ids.setdefault(string, len(ids))
+
+    def intern_all(self, strings):
+        ids = self.ids
+        return [ids.setdefault(string, len(ids)) for string in strings]
+
+    @property
+    def strings(self):
+        """id -> string list (dicts keep insertion order, so it is rebuilt only after growth)"""
+        if len(self._strings) != len(self.ids):
+            self._strings = list(self.ids)
+        return self._strings
+
+
+class Columns:
+    """One batch of messages as token id, offset and (optional) tag id arrays"""
+
+    def __init__(self, vocab, token_ids, offsets, tags=None, tag_ids=None):
+        self.vocab = vocab
+        self.token_ids = token_ids
+        self.offsets = offsets
+        self.tags = tags
+        self.tag_ids = tag_ids
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def message_ids(self):
+        """Message number of every token"""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    @property
+    def nbytes(self):
+        arrays = (self.token_ids, self.offsets, self.tag_ids)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def tokens(self, i):
+        strings = self.vocab.strings
+        return [strings[t] for t in self.token_ids[self.offsets[i]:self.offsets[i + 1]].tolist()]
+
+    def tagged(self, i):
+        """Message ``i`` as the usual list of (word, tag) tuples"""
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        tags = self.tags.strings
+        return list(zip(self.tokens(i), (tags[t] for t in self.tag_ids[lo:hi].tolist())))
+
+    def to_tuples(self):
+        return [self.tagged(i) for i in range(len(self))]
+
+    @classmethod
+    def from_tuples(cls, tagged, vocab=None, tags=None):
+        """Columns for lists of (word, tag) tuples, e.g. nltk.pos_tag_sents output"""
+        vocab = vocab if vocab is not None else Vocabulary()
+        tags = tags if tags is not None else Vocabulary()
+        token_ids, tag_ids, offsets = array('I'), array('B'), array('q', [0])
+        for sentence in tagged:
+            token_ids.extend(vocab.intern_all(word for word, _ in sentence))
+            tag_ids.extend(tags.intern_all(tag for _, tag in sentence))
+            offsets.append(len(token_ids))
+        return cls(vocab, np.frombuffer(token_ids, dtype=np.uint32), np.frombuffer(offsets, dtype=np.int64),
+                   tags, np.frombuffer(tag_ids, dtype=np.uint8))
+
+
+def encode(texts, pattern, vocab):
+    """Tokenize ``texts`` with the regex ``pattern`` straight into Columns"""
+    ids = vocab.ids
+    token_ids, offsets = array('I'), array('q', [0])
+    for text in texts:
+        token_ids.extend([ids.setdefault(token, len(ids)) for token in pattern.findall(text)])
+        offsets.append(len(token_ids))
+    return Columns(vocab, np.frombuffer(token_ids, dtype=np.uint32), np.frombuffer(offsets, dtype=np.int64))
+
+
+def extend_table(table, vocab, func, dtype):
+    """Grow ``table`` (one func(string) value per vocabulary id) to cover new ids"""
+    if table is None:
+        table = np.empty(0, dtype=dtype)
+    if len(table) < len(vocab):
+        new = vocab.strings[len(table):]
+        table = np.concatenate((table, np.fromiter(map(func, new), dtype=dtype, count=len(new))))
+    return table
+
+
+def first_pairs(messages, values, n_values):
+    """Unique (message, value) pairs for values >= 0, in order of first appearance"""
+    keep = values >= 0
+    messages, values = messages[keep], values[keep]
+    _, first = np.unique(messages * n_values + values, return_index=True)
+    first.sort()
+    return messages[first], values[first]
@@ -0,0 +1,211 @@
+"""Self-contained context bot used by the Streamlit app (no NLTK data needed)."""
+import os
+import re
+import threading
+from collections import namedtuple
+
+from rules import ResponseRules
+from senses import SENSES_PATH, SenseInventory
+
+# A token with its lowercase form and character offsets in the input
+Token = namedtuple('Token', ['text', 'lower', 'start', 'end'])
+
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)?|\S")
+
+# Extra "word<TAB>TAG" lines for the POS lexicon; lines starting with '#'
+# are comments
+POS_LEXICON_PATH = os.environ.get('CONTEXTBOT_POS_LEXICON')
+
+# Checked in order for words that are not in the lexicon (case-sensitive)
+SUFFIX_RULES = (
+    ('ing', 'VBG'),
+)
+DEFAULT_TAG = 'NN'
+
+# Response rules (see rules.py)
+RESPONSES_PATH = os.environ.get('CONTEXTBOT_BOT_RESPONSES') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'bot_responses.json')
+
+# Words either side of an ambiguous word used as its context (0 = whole
+# message); the same CONTEXTBOT_WSD_WINDOW setting as project.py
+CONTEXT_WINDOW = int(os.environ.get('CONTEXTBOT_WSD_WINDOW', '10')) or None
+
+
+def load_lexicon(path):
+    """Read a word -> tag mapping from a tab-separated file"""
+    lexicon = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split('\t')]
+            if len(fields) != 2 or not all(fields):
+                raise ValueError(f"{path}:{number}: expected 'word<TAB>TAG', got {line!r}")
+            word, tag = fields
+            lexicon[word.lower()] = tag
+    return lexicon
+
+
+class NLPChatBot:
+    def __init__(self, lexicon_path=POS_LEXICON_PATH, senses_path=SENSES_PATH,
+                 context_window=CONTEXT_WINDOW, responses_path=RESPONSES_PATH):
+        # Sense profiles for every ambiguous word we know about
+        self.sense_inventory = SenseInventory.load(senses_path)
+        self.context_window = context_window
+        self.vector_scorer = None  # built on first disambiguate_batch()
+        self.responses = ResponseRules.load(responses_path)
+        
+        # POS tagging rules
+        self.pronouns = {'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her'}
+        self.prepositions = {'in', 'on', 'at', 'by', 'for', 'with', 'about', 'to', 'from', 'of', 'near'}
+        self.be_verbs = {'am', 'is', 'are', 'was', 'were'}
+        
+        # One word -> tag lexicon (pronouns win over be-verbs over prepositions)
+        self.lexicon = {}
+        for words, tag in ((self.prepositions, 'IN'), (self.be_verbs, 'VBP'), (self.pronouns, 'PRP')):
+            self.lexicon.update(dict.fromkeys(words, tag))
+        if lexicon_path:
+            self.lexicon.update(load_lexicon(lexicon_path))
+        self.suffix_rules = SUFFIX_RULES
+        self._suffixes = tuple(suffix for suffix, _ in self.suffix_rules)
+        
+        # Columnar batches (see columnar.py): interned token and tag strings,
+        # and per-vocabulary-id tag / scorer lookup tables grown as needed
+        self.vocabulary = None
+        self.tags = None
+        self._tables = {}
+        self._columns_lock = threading.Lock()
+    
+    def iter_tokens(self, text):
+        """Yield Token records one at a time (for very long inputs)"""
+        for match in TOKEN_PATTERN.finditer(text):
+            token = match.group()
+            yield Token(token, token.lower(), match.start(), match.end())
+    
+    def tokenize(self, text):
+        """Simple regex tokenizer that doesn't require NLTK"""
+        return list(self.iter_tokens(text))
+    
+    def pos_tag(self, tokens):
+        """Rule-based POS tagger: lexicon lookup, then suffix rules, then noun"""
+        lexicon, suffixes = self.lexicon, self._suffixes
+        pos_tags = []
+        append = pos_tags.append
+        for text, lower, _, _ in tokens:
+            tag = lexicon.get(lower)
+            if tag is None:
+                tag = DEFAULT_TAG
+                # One endswith() call rejects most words before the ordered scan
+                if text.endswith(suffixes):
+                    for suffix, suffix_tag in self.suffix_rules:
+                        if text.endswith(suffix):
+                            tag = suffix_tag
+                            break
+            append((text, tag))
+        return pos_tags
+    
+    def disambiguate(self, tokens):
+        """Glosses for every ambiguous word in ``tokens``: {lemma: gloss}"""
+        words = [token.lower for token in tokens]
+        senses = self.sense_inventory.disambiguate(words, self.context_window)
+        return {lemma: sense.gloss for lemma, sense in senses.items()}
+    
+    def _scorer(self):
+        if self.vector_scorer is None:
+            from sense_vectors import VectorSenseScorer
+            self.vector_scorer = VectorSenseScorer(self.sense_inventory)
+        return self.vector_scorer
+    
+    def disambiguate_batch(self, texts):
+        """IDF-weighted glosses for many texts at once, via the vectorized scorer"""
+        messages = [[token.lower for token in self.iter_tokens(text)] for text in texts]
+        return [{lemma: sense.gloss for lemma, sense in senses.items()}
+                for senses in self._scorer().score_batch(messages)]
+    
+    def disambiguate_bank(self, tokens):
+        """Determine if bank is river or financial"""
+        words = [token.lower for token in tokens]
+        if self.context_window is not None and 'bank' in words:
+            words = words[max(0, words.index('bank') - self.context_window):
+                          words.index('bank') + self.context_window + 1]
+        scores = self.sense_inventory.score(set(words), {'bank'})
+        return self.sense_inventory.best('bank', scores).gloss
+    
+    def tag_word(self, text):
+        """pos_tag() for one token string"""
+        tag = self.lexicon.get(text.lower())
+        if tag is None:
+            for suffix, suffix_tag in self.suffix_rules:
+                if text.endswith(suffix):
+                    return suffix_tag
+            return DEFAULT_TAG
+        return tag
+    
+    def encode(self, texts):
+        """Tokenize ``texts`` into columnar.Columns over the bot's vocabulary"""
+        import columnar
+        with self._columns_lock:
+            if self.vocabulary is None:
+                self.vocabulary, self.tags = columnar.Vocabulary(), columnar.Vocabulary()
+            return columnar.encode(texts, TOKEN_PATTERN, self.vocabulary)
+    
+    def _table(self, columns, name, func, dtype):
+        import columnar
+        if columns.vocab is not self.vocabulary:
+            raise ValueError("columns were not encoded by this bot")
+        with self._columns_lock:
+            table = self._tables[name] = columnar.extend_table(self._tables.get(name), self.vocabulary, func, dtype)
+            return table
+    
+    def pos_tag_columns(self, columns):
+        """Tag every token of ``columns`` at once; sets and returns columns.tag_ids"""
+        import numpy as np
+        table = self._table(columns, 'tag', lambda word: self.tags.intern(self.tag_word(word)), np.uint8)
+        columns.tags, columns.tag_ids = self.tags, table[columns.token_ids]
+        return columns.tag_ids
+    
+    def disambiguate_columns(self, columns):
+        """disambiguate_batch() for Columns: IDF-weighted {lemma: gloss} per message"""
+        import numpy as np
+        from columnar import first_pairs
+        scorer = self._scorer()
+        terms = self._table(columns, 'term', lambda word: scorer.vocab.get(word.lower(), -1), np.int64)
+        lemmas = self._table(columns, 'lemma', lambda word: scorer.form_ids.get(word.lower(), -1), np.int64)
+        messages = columns.message_ids
+        term_msg, term_ids = first_pairs(messages, terms[columns.token_ids], len(scorer.vocab))
+        pair_msg, pair_lemma = first_pairs(messages, lemmas[columns.token_ids], len(scorer.lemmas))
+        return [{lemma: sense.gloss for lemma, sense in senses.items()}
+                for senses in scorer.score_encoded(len(columns), term_msg, term_ids, pair_msg, pair_lemma)]
+    
+    def analyze_batch(self, texts):
+        """Columnar analyze() for bulk runs: (Columns with tag ids, senses, responses).
+
+        Senses come from the IDF-weighted scorer, as in disambiguate_batch().
+        """
+        columns = self.encode(texts)
+        self.pos_tag_columns(columns)
+        senses = self.disambiguate_columns(columns)
+        responses, by_gloss = [], {}
+        for message_senses in senses:
+            gloss = message_senses.get('bank', '')
+            if gloss not in by_gloss:
+                by_gloss[gloss] = self.generate_response(gloss)
+            responses.append(by_gloss[gloss])
+        return columns, senses, responses
+    
+    def generate_response(self, bank_sense):
+        """Generate appropriate response"""
+        return self.responses.respond((), {'bank': bank_sense})
+    
+    def analyze(self, text):
+        """Tokenize, tag and disambiguate ``text``; returns (pos_tags, senses, response)"""
+        tokens = self.tokenize(text)
+        pos_tags = self.pos_tag(tokens)
+        
+        # Word sense disambiguation
+        senses = self.disambiguate(tokens)
+        
+        # Generate response
+        response = self.generate_response(senses.get('bank', ''))
+        return pos_tags, senses, response
@@ -0,0 +1,391 @@
+"""Precomputed signature index for simplified Lesk over WordNet.
+
+nltk.wsd.lesk splits the definition of every candidate synset on every call.
+This module does that work once: each definition token is interned to an
+integer ID and every synset's signature is stored as a sorted run of IDs in
+a flat uint32 array.  At query time the context is mapped to IDs and each
+candidate is scored with one set intersection.  The index also carries the
+lemma -> synset table and morphy's exception lists, so lookups never touch
+the WordNet corpus reader.
+
+File layout (native byte order):
+
+    b'LESKIDX2' | uint64 header length | JSON header | padding to 8 bytes
+    | sections, each padded to 8 bytes
+
+The header holds the WordNet checksum, morphy's suffix rules and the
+(start, size) of every section, counted from the end of the header padding.
+Everything else is memory-mapped, not copied, so opening the index costs a
+few page faults and processes share its pages:
+
+    signatures             uint32 offsets[synsets + 1] | uint32 token ids
+    names, definitions     uint32 offsets[synsets + 1] | UTF-8 text
+    pos                    one ASCII letter per synset
+    vocab                  strings (as above) | uint32 CRC-32s | buckets
+    lemmas.<p>             strings | CRC-32s | buckets | runs of synset
+                           numbers (as signatures), one table per POS
+    exceptions.<p>         strings | CRC-32s | buckets | space-separated
+                           base forms
+
+Keyed tables (vocab, lemmas, exceptions) store their keys ordered by CRC-32,
+and uint32 buckets[2 ** bits + 1] index those CRCs by their top bits, so a
+key is found by bisecting one bucket and comparing the UTF-8 bytes.
+
+    python lesk_index.py build [PATH]   # build from the installed WordNet
+    python lesk_index.py verify [PATH]  # compare with nltk's lesk on data/sample_chat.txt
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from resources import DATA_DIR
+
+MAGIC = b'LESKIDX2'
+POS_LIST = ('n', 'v', 'a', 'r')
+MEMO_ENTRIES = 16384  # recent lookups each keyed table remembers
+
+
+def index_path(data_dir=DATA_DIR):
+    """CONTEXTBOT_LESK_INDEX, or the index's place under ``data_dir``"""
+    return os.environ.get('CONTEXTBOT_LESK_INDEX') or os.path.join(data_dir, 'contextbot', 'lesk_index.bin')
+
+
+DEFAULT_PATH = index_path()
+
+Sense = namedtuple('Sense', ['name', 'definition'])
+
+
+def morphy(form, pos, lemmas, exceptions, substitutions):
+    """Base forms of ``form`` known for ``pos``, mirroring nltk's WordNet _morphy"""
+    known = lemmas[pos]
+
+    def apply_rules(forms):
+        return [form[:-len(old)] + new
+                for form in forms
+                for old, new in substitutions[pos]
+                if form.endswith(old)]
+
+    def filter_forms(forms):
+        result = []
+        for form in forms:
+            if form in known and form not in result:
+                result.append(form)
+        return result
+
+    if form in exceptions[pos]:
+        forms = exceptions[pos][form]
+    else:
+        forms = apply_rules([form])
+    return filter_forms([form] + forms)
+
+
+def _key(text):
+    return zlib.crc32(text.encode('utf-8', 'surrogatepass'))
+
+
+class _Runs:
+    """Run i of a mapped array, delimited by uint32 offsets[n + 1]"""
+
+    def __init__(self, offsets, items):
+        self._offsets = offsets
+        self._items = items
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return self._items[self._offsets[i]:self._offsets[i + 1]]
+
+
+class _Strings(_Runs):
+    def __getitem__(self, i):
+        return str(self._items[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+
+class _FormLists(_Runs):
+    def __getitem__(self, i):
+        return str(self._items[self._offsets[i]:self._offsets[i + 1]], 'utf-8').split()
+
+
+_MISSING = object()
+
+
+class _Table:
+    """Mapping from the mapped ``keys`` (ordered by their CRC-32s) to ``values[i]``.
+
+    Chat messages keep using the same words, so the positions of the last
+    MEMO_ENTRIES keys looked up (found or not) are kept in a dict, which is
+    emptied when it fills up so that typos cannot grow it without bound.
+    """
+
+    def __init__(self, keys, crcs, buckets, values):
+        self.keys = keys
+        self._memo = {}
+        self._crcs = crcs
+        self._buckets = buckets
+        self._shift = 33 - (len(buckets) - 1).bit_length()  # 32 - bits
+        self._values = values
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index(self, key):
+        """Position of ``key``, or None if it is not in the table"""
+        i = self._memo.get(key, _MISSING)
+        if i is _MISSING:
+            if len(self._memo) >= MEMO_ENTRIES:
+                self._memo.clear()
+            i = self._memo[key] = self._find(key)
+        return i
+
+    def _find(self, key):
+        encoded = key.encode('utf-8', 'surrogatepass')
+        crc, crcs = zlib.crc32(encoded), self._crcs
+        bucket = crc >> self._shift
+        hi = self._buckets[bucket + 1]
+        i = bisect_left(crcs, crc, self._buckets[bucket], hi)
+        offsets, text = self.keys._offsets, self.keys._items
+        while i < hi and crcs[i] == crc:
+            if text[offsets[i]:offsets[i + 1]] == encoded:
+                return i
+            i += 1
+        return None
+
+    def __contains__(self, key):
+        return self.index(key) is not None
+
+    def __getitem__(self, key):
+        i = self.index(key)
+        if i is None:
+            raise KeyError(key)
+        return self._values[i]
+
+
+class LeskIndex:
+    """Read-only view over an index file written by build()"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a Lesk index")
+        (header_len,) = struct.unpack_from('Q', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_len])
+        self.wordnet_checksum = header['wordnet']
+        self.substitutions = header['substitutions']
+        self.examined = 0  # candidate synsets scored by lesk(), for metrics
+
+        view, base, sections = memoryview(self._mmap), _align(start + header_len), header['sections']
+
+        def section(name, format='B'):
+            begin, size = sections[name]
+            return view[base + begin:base + begin + size].cast(format)
+
+        def strings(name):
+            return _Strings(section(name + '.offsets', 'I'), section(name + '.text'))
+
+        def table(name, values):
+            return _Table(strings(name), section(name + '.crcs', 'I'), section(name + '.buckets', 'I'), values)
+
+        self._signatures = _Runs(section('signatures.offsets', 'I'), section('signatures.ids', 'I'))
+        self.names = strings('names')
+        self.definitions = strings('definitions')
+        self.pos = section('pos')
+        self.vocab = table('vocab', range(len(section('vocab.crcs', 'I'))))
+        self.lemmas = {p: table(f'lemmas.{p}', _Runs(section(f'lemmas.{p}.synsets.offsets', 'I'),
+                                                     section(f'lemmas.{p}.synsets.ids', 'I')))
+                       for p in POS_LIST}
+        self.exceptions = {p: table(f'exceptions.{p}', _FormLists(section(f'exceptions.{p}.forms.offsets', 'I'),
+                                                                  section(f'exceptions.{p}.forms.text')))
+                           for p in POS_LIST}
+
+    def synsets(self, word, pos=None):
+        """Synset numbers for ``word``, like wn.synsets(word) restricted to ``pos``"""
+        word = word.lower()
+        found = []
+        lookup = POS_LIST if pos is None else ('a' if pos == 's' else pos,)
+        for p in lookup:
+            for form in morphy(word, p, self.lemmas, self.exceptions, self.substitutions):
+                found.extend(self.lemmas[p][form])
+        if pos is not None:
+            code = ord(pos)
+            found = [i for i in found if self.pos[i] == code]
+        return found
+
+    def signature(self, i):
+        return self._signatures[i]
+
+    def lesk(self, context, word, pos=None):
+        """Same answer as nltk.wsd.lesk(context, word, pos), as a Sense or None"""
+        candidates = self.synsets(word, pos)
+        if not candidates:
+            return None
+        self.examined += len(candidates)
+        context_ids = set(map(self.vocab.index, context))
+        context_ids.discard(None)
+        scores = [(len(context_ids.intersection(self.signature(i))), i) for i in candidates]
+        top = max(scores)[0]
+        # nltk breaks ties by comparing Synsets, i.e. by name
+        _, best = max((self.names[i], i) for score, i in scores if score == top)
+        return Sense(self.names[best], self.definitions[best])
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _crc_order(strings):
+    """``strings`` in the order of their CRC-32s (then of the strings), with
+    those CRCs and the buckets that index them by their top bits"""
+    ordered = sorted(strings, key=lambda string: (_key(string), string))
+    crcs = array('I', map(_key, ordered))
+    bits = max(len(crcs).bit_length() - 1, 0)  # one or two keys per bucket
+    buckets, i = array('I'), 0
+    for bucket in range((1 << bits) + 1):
+        while i < len(crcs) and crcs[i] >> (32 - bits) < bucket:
+            i += 1
+        buckets.append(i)
+    return ordered, crcs, buckets
+
+
+def _runs(runs, typecode='I'):
+    """(offsets, items) arrays for _Runs over the sequences ``runs``"""
+    offsets, items = array('I', [0]), array(typecode)
+    for run in runs:
+        items.extend(run)
+        offsets.append(len(items))
+    return offsets, items
+
+
+def _text(strings):
+    """(offsets, UTF-8 bytes) for _Strings"""
+    offsets, text = _runs((string.encode('utf-8') for string in strings), 'B')
+    return offsets, text.tobytes()
+
+
+def build(path=DEFAULT_PATH, wordnet_checksum=None):
+    """Write an index for the installed WordNet to ``path``"""
+    from nltk.corpus import wordnet as wn
+
+    names, pos, definitions, number, sections = [], [], [], {}, {}
+    for ss in wn.all_synsets():
+        number[(ss.pos(), ss.offset())] = len(names)
+        names.append(ss.name())
+        pos.append(ss.pos())
+        definitions.append(ss.definition())
+    tokens, sections['vocab.crcs'], sections['vocab.buckets'] = _crc_order(
+        {token for definition in definitions for token in definition.split()})
+    vocab = {token: i for i, token in enumerate(tokens)}
+
+    sections['signatures.offsets'], sections['signatures.ids'] = _runs(
+        sorted({vocab[token] for token in definition.split()}) for definition in definitions)
+    sections['names.offsets'], sections['names.text'] = _text(names)
+    sections['definitions.offsets'], sections['definitions.text'] = _text(definitions)
+    sections['pos'] = ''.join(pos).encode('ascii')
+    sections['vocab.offsets'], sections['vocab.text'] = _text(tokens)
+
+    # wn.synsets() consults the lemma map for n/v/a/r; adjective entries
+    # point at both head ('a') and satellite ('s') synsets
+    for p in POS_LIST:
+        by_lemma = {lemma: [number[(p, off)] if (p, off) in number else number[('s', off)] for off in by_pos[p]]
+                    for lemma, by_pos in wn._lemma_pos_offset_map.items() if p in by_pos}
+        lemmas, sections[f'lemmas.{p}.crcs'], sections[f'lemmas.{p}.buckets'] = _crc_order(by_lemma)
+        sections[f'lemmas.{p}.offsets'], sections[f'lemmas.{p}.text'] = _text(lemmas)
+        sections[f'lemmas.{p}.synsets.offsets'], sections[f'lemmas.{p}.synsets.ids'] = _runs(
+            by_lemma[lemma] for lemma in lemmas)
+
+        exceptions = wn._exception_map[p]
+        forms, sections[f'exceptions.{p}.crcs'], sections[f'exceptions.{p}.buckets'] = _crc_order(exceptions)
+        sections[f'exceptions.{p}.offsets'], sections[f'exceptions.{p}.text'] = _text(forms)
+        sections[f'exceptions.{p}.forms.offsets'], sections[f'exceptions.{p}.forms.text'] = _text(
+            ' '.join(exceptions[form]) for form in forms)
+
+    layout, size = {}, 0
+    for name, data in sections.items():
+        layout[name] = (size, len(data) * data.itemsize if isinstance(data, array) else len(data))
+        size = _align(size + layout[name][1])
+    header = json.dumps({
+        'wordnet': wordnet_checksum,
+        'substitutions': {p: list(wn.MORPHOLOGICAL_SUBSTITUTIONS[p]) for p in POS_LIST},
+        'sections': layout,
+    }).encode('utf-8')
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('Q', len(header)))
+        f.write(header)
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        for data in sections.values():
+            f.write(data)
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+    os.replace(tmp, path)
+    return path
+
+
+def load(path=DEFAULT_PATH, wordnet_checksum=None):
+    """Open the index at ``path``; None if it is missing or built for other WordNet data"""
+    if not os.path.exists(path):
+        return None
+    try:
+        index = LeskIndex(path)
+    except ValueError:
+        return None  # an index in an older format
+    if wordnet_checksum is not None and index.wordnet_checksum != wordnet_checksum:
+        return None
+    return index
+
+
+def verify(index, sentences):
+    """Compare index.lesk with nltk's lesk on every token; return the mismatches"""
+    from nltk import pos_tag, word_tokenize
+    from nltk.wsd import lesk
+
+    from project import get_wordnet_pos
+
+    mismatches = []
+    for sentence in sentences:
+        tokens = word_tokenize(sentence)
+        for word, tag in pos_tag(tokens):
+            wn_pos = get_wordnet_pos(tag)
+            expected = lesk(tokens, word, pos=wn_pos)
+            got = index.lesk(tokens, word, pos=wn_pos)
+            expected = expected.name() if expected else None
+            got = got.name if got else None
+            if expected != got:
+                mismatches.append((sentence, word, wn_pos, expected, got))
+    return mismatches
+
+
+if __name__ == '__main__':
+    import time
+
+    from resources import ensure_resources, wordnet_checksum
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH
+    ensure_resources()
+    if command == 'build':
+        start = time.perf_counter()
+        build(path, wordnet_checksum())
+        print(f"wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    elif command == 'verify':
+        sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_chat.txt')
+        with open(sample, encoding='utf-8') as f:
+            sentences = [line.strip() for line in f if line.strip()]
+        mismatches = verify(LeskIndex(path), sentences)
+        for mismatch in mismatches:
+            print("MISMATCH", mismatch)
+        print(f"{len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    else:
+        sys.exit(f"unknown command {command!r}; expected build or verify")
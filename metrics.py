@@ -0,0 +1,117 @@
+"""Low-overhead metrics registry for the chat pipelines.
+
+Counters and timers live in plain dicts behind one lock; a timer keeps the
+number of observations and their total.  Instrumented code checks
+``registry.enabled`` once per message and takes its untimed path when
+metrics are off, so a disabled registry costs one attribute lookup.
+Metrics are enabled with CONTEXTBOT_METRICS=1 (or ``registry.enabled =
+True``) and exported with prometheus() or as_json().
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'contextbot_'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+class Registry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}  # (name, labels) -> total
+        self.timers = {}    # (name, labels) -> [count, total seconds]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                self.timers[key] = [1, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block into ``name`` (when enabled); for code off the hot path"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, reset=False):
+        """{'counters': [[name, labels, value]], 'timers': [[name, labels, count, seconds]]}"""
+        with self._lock:
+            snapshot = {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'timers': [[name, dict(labels), count, total]
+                           for (name, labels), (count, total) in self.timers.items()],
+            }
+            if reset:
+                self.counters, self.timers = {}, {}
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add a snapshot() taken elsewhere (e.g. in a worker process) into this registry"""
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = _key(name, labels)
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, count, total in snapshot['timers']:
+                timer = self.timers.setdefault(_key(name, labels), [0, 0.0])
+                timer[0] += count
+                timer[1] += total
+
+    def clear(self):
+        with self._lock:
+            self.counters, self.timers = {}, {}
+
+    def as_json(self):
+        return json.dumps(self.snapshot())
+
+    def prometheus(self):
+        """Prometheus text exposition format: counters as counters, timers as summaries"""
+        lines, typed = [], set()
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timers = sorted((key, tuple(value)) for key, value in self.timers.items())
+        for (name, labels), value in counters:
+            name = PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (count, total) in timers:
+            name = PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} summary")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(enabled=os.environ.get('CONTEXTBOT_METRICS', '') not in ('', '0'))
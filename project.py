@@ -1,97 +1,394 @@
-# Install required libraries
+"""Context-aware chatbot pipeline: spelling correction, POS tagging and WSD.
 
+Importing this module is cheap: NLTK, the SpellChecker and the Lesk index
+are loaded on first use (or by calling load()), once per process and
+safely from several threads.  The interactive REPL lives in cli.py.
+"""
+import atexit
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+from resources import ensure_resources, wordnet_checksum
+from cache import LRUCache
+from windows import SlidingWindow
+import lesk_index
+import metrics
+import rules
+import symspell
+import wordnet_lite
+import wsd_cache
 
-# Import libraries
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk import pos_tag
-from nltk.corpus import wordnet as wn
-from nltk.wsd import lesk
-from spellchecker import SpellChecker
+# Memoize corrections: chat traffic repeats the same typos constantly.
+# Set CONTEXTBOT_SPELL_CACHE to a file path to keep the cache across restarts.
+SPELL_CACHE_PATH = os.environ.get('CONTEXTBOT_SPELL_CACHE')
+spell_cache = LRUCache(max_entries=50000, max_bytes=16 * 1024 * 1024, path=SPELL_CACHE_PATH)
+if SPELL_CACHE_PATH:
+    atexit.register(spell_cache.save)
 
-# Download NLTK data
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('wordnet')
-nltk.download('omw-1.4')
-nltk.download('stopwords')
+# Spelling backend: 'pyspellchecker', or 'symspell' for the precomputed
+# symmetric-delete index (built by `python resources.py`), which gives the
+# same corrections in microseconds rather than milliseconds
+SPELL_BACKEND = os.environ.get('CONTEXTBOT_SPELL_BACKEND', 'pyspellchecker')
+SPELL_BACKENDS = ('pyspellchecker', 'symspell')
 
-# Initialize SpellChecker
-spell = SpellChecker()
+# Resources loaded by load(): NLTK functions, the spelling backend and its
+# lowercase word list, the Lesk index, the WordNet reader, the lesk result
+# cache and the WSD stopwords
+word_tokenize = pos_tag = pos_tag_sents = lesk = None
+spell = None
+known_words = frozenset()
+wsd_index = None
+wordnet = None
+lesk_cache = None
+WSD_STOPWORDS = frozenset()
 
-# Define POS tag converter for WordNet
+_load_lock = threading.Lock()
+_loaded = False
+
+def load():
+    """Load every resource the pipeline needs; cheap once it has run"""
+    global word_tokenize, pos_tag, pos_tag_sents, lesk, spell, known_words, wsd_index, wordnet, lesk_cache
+    global WSD_STOPWORDS, _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        if SPELL_BACKEND not in SPELL_BACKENDS:
+            raise ValueError(f"CONTEXTBOT_SPELL_BACKEND must be one of {SPELL_BACKENDS}, not {SPELL_BACKEND!r}")
+        # Make sure NLTK data is available locally (only fetches what is missing)
+        ensure_resources()
+        from nltk import pos_tag, pos_tag_sents, word_tokenize
+        from nltk.corpus import stopwords
+        from nltk.wsd import lesk
+        from spellchecker import SpellChecker
+
+        # Lesk backend, in order of preference: the precomputed signature index
+        # (built by `python resources.py`), which is memory-mapped whole and
+        # opens in about a millisecond, so processes only fault in the pages
+        # (and parts of speech) they use, and answers each lookup without
+        # parsing WordNet; when it is missing or stale, the lazy WordNet
+        # reader, which parses the lemmas and synsets it reaches per POS;
+        # and nltk's lesk when WordNet is only available zipped
+        checksum = wordnet_checksum()
+        wsd_index = lesk_index.load(wordnet_checksum=checksum)
+        wordnet = wordnet_lite.load() if wsd_index is None else None
+        # Lesk results for every message; set CONTEXTBOT_WSD_CACHE to a file
+        # path to share them between processes and restarts
+        lesk_cache = wsd_cache.WSDCache(
+            wordnet_checksum=checksum, vocab=wsd_index.vocab if wsd_index is not None else None)
+        # Without a (current) SymSpell index we fall back to the SpellChecker
+        spell = symspell.load() if SPELL_BACKEND == 'symspell' else None
+        if spell is None:
+            spell = SpellChecker()
+        # Membership without SpellChecker.__contains__'s per-call overhead;
+        # the SymSpell index answers it from its word table
+        known_words = spell.word_frequency.dictionary.keys() if isinstance(spell, SpellChecker) else spell
+        WSD_STOPWORDS = frozenset(stopwords.words('english'))
+        _loaded = True
+
+# Define POS tag converter for WordNet (wn.ADJ, wn.VERB, wn.NOUN, wn.ADV;
+# spelled out so that tagging does not have to load WordNet)
 def get_wordnet_pos(treebank_tag):
     if treebank_tag.startswith('J'):
-        return wn.ADJ
+        return 'a'
     elif treebank_tag.startswith('V'):
-        return wn.VERB
+        return 'v'
     elif treebank_tag.startswith('N'):
-        return wn.NOUN
+        return 'n'
     elif treebank_tag.startswith('R'):
-        return wn.ADV
+        return 'r'
     else:
-        return wn.NOUN  # default
+        return 'n'  # default
+
+# Content-word filter for WSD: only words with one of these tag prefixes
+# (nouns, verbs, adjectives, adverbs) that are not stopwords go to lesk
+WSD_TAG_PREFIXES = ('NN', 'VB', 'JJ', 'RB')
+
+def is_content_word(word, tag):
+    load()
+    return (tag.startswith(WSD_TAG_PREFIXES)
+            and any(c.isalpha() for c in word)
+            and word.lower() not in WSD_STOPWORDS)
+
+# Lesk context: tokens within this many positions of the target word
+# (CONTEXTBOT_WSD_WINDOW=0 uses the whole message, as nltk's lesk does)
+WSD_WINDOW = int(os.environ.get('CONTEXTBOT_WSD_WINDOW', '10')) or None
+
+# A token of the original input: its text, spell-corrected form and span
+Token = namedtuple('Token', ['text', 'corrected', 'start', 'end'])
+
+# word_tokenize rewrites double quotes as `` and ''
+_QUOTE_FORMS = {'``': ('"', '``'), "''": ('"', "''")}
+
+def _token_span(text, word, cursor):
+    best = None
+    for form in _QUOTE_FORMS.get(word, (word,)):
+        start = text.find(form, cursor)
+        if start != -1 and (best is None or start < best[0]):
+            best = (start, start + len(form))
+    return best or (cursor, cursor)
+
+# Spelling pre-pass: only out-of-vocabulary tokens made of letters go to the
+# spelling backend.  URLs and e-mail addresses are found in the raw text,
+# since word_tokenize splits them, and every token inside one is kept as it
+# is; so are numbers (including "3,000", "12:30", "1st" and "½"),
+# punctuation, emoji (any token of symbols such as "😀" or "©") and other
+# tokens mixing letters with digits or symbols ("x2").  Hashtags and dotted
+# names ("#tag", "node.js") are found in the raw text as well, and the letter
+# tokens inside them are 'other' rather than 'oov'.  The raw text is matched
+# one whitespace-separated chunk at a time (less its surrounding
+# punctuation) with fullmatch, so a long run without spaces costs linear
+# time.
+TOKEN_CLASSES = ('known', 'numeric', 'punctuation', 'url', 'emoji', 'other', 'oov')
+_URL = re.compile(r'[a-z][a-z0-9+.-]*://[^\s<>"]+|www\.[^\s<>"]+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+',
+                  re.IGNORECASE)
+_VERBATIM = re.compile(r'#\w+|[^\W\d_]\w*(?:\.[a-z0-9]\w*)+')
+_CHUNK = re.compile(r'\S+')
+_OPENERS = '([{<"\''
+_CLOSERS = '.,;:!?)]}>"\''
+_LETTER = re.compile(r'[^\W\d_]')
+
+def classify_token(word):
+    """One of TOKEN_CLASSES for a single token; only 'oov' tokens need spelling correction"""
+    load()
+    return _classify(word)
+
+def _classify(word):
+    if word.lower() in known_words:
+        return 'known'
+    if word.isalpha():
+        return 'oov'
+    if _URL.fullmatch(word):
+        return 'url'
+    if word.lstrip('+-.')[:1].isnumeric():
+        return 'numeric'
+    if not _LETTER.search(word):
+        return 'emoji' if any(unicodedata.category(c) == 'So' for c in word) else 'punctuation'
+    return 'other'
+
+def classify_tokens(text, words):
+    """(word, start, end, class) for the word_tokenize output ``words`` of ``text``"""
+    load()
+    return list(_iter_classified(text, words))
+
+def _verbatim_spans(text):
+    """(start, end, kind) of the URLs and e-mail addresses ('url') and the
+    hashtags and dotted names ('other') in ``text``, in order"""
+    spans = []
+    for chunk in _CHUNK.finditer(text):
+        word = chunk.group()
+        if '.' not in word and ':' not in word and '@' not in word and '#' not in word:
+            continue
+        word = word.lstrip(_OPENERS)
+        start = chunk.end() - len(word)
+        word = word.rstrip(_CLOSERS)
+        if _URL.fullmatch(word):
+            spans.append((start, start + len(word), 'url'))
+        elif _VERBATIM.fullmatch(word):
+            spans.append((start, start + len(word), 'other'))
+    return spans
+
+def _iter_classified(text, words):
+    spans = _verbatim_spans(text)
+    cursor = i = 0
+    for word in words:
+        start, cursor = _token_span(text, word, cursor)
+        while i < len(spans) and spans[i][1] <= start:
+            i += 1
+        inside = i < len(spans) and spans[i][0] <= start and cursor <= spans[i][1]
+        if inside and spans[i][2] == 'url':
+            yield word, start, cursor, 'url'
+            continue
+        kind = _classify(word)
+        if inside and kind == 'oov':
+            kind = 'other'
+        yield word, start, cursor, kind
 
 # Function to correct spelling
+def correct_word(word):
+    if classify_token(word) != 'oov':
+        return word
+    return _correct_oov(word)
+
+def _correct_oov(word):
+    return spell_cache.get_or_compute(word, spell.correction) or word
+
+def _make_tokens(text, words):
+    """Spell-corrected Tokens with their spans in ``text``"""
+    return [Token(word, _correct_oov(word) if kind == 'oov' else word, start, end)
+            for word, start, end, kind in _iter_classified(text, words)]
+
+def tokenize(text):
+    """Tokenize ``text`` once into spell-corrected Tokens with their offsets"""
+    load()
+    words = word_tokenize(text)
+    return _make_tokens(text, words)
+
 def correct_spelling(text):
-    tokens = word_tokenize(text)
-    corrected_tokens = [spell.correction(word) if word not in spell else word for word in tokens]
-    return ' '.join(corrected_tokens)
+    return ' '.join(token.corrected for token in tokenize(text))
+
+# Word Sense Disambiguation over tagged tokens
+def lesk_definition(context, word, wn_pos):
+    """Definition of the lesk sense of ``word``, or None (cached in lesk_cache)"""
+    load()
+    key, definition = lesk_cache.lookup(word, wn_pos, context)
+    if definition is wsd_cache.MISSING:
+        definition = _lesk_definition(context, word, wn_pos)
+        lesk_cache.store(key, definition)
+    return definition
+
+def _lesk_definition(context, word, wn_pos):
+    backend = wsd_index if wsd_index is not None else wordnet
+    if backend is not None:
+        sense = backend.lesk(context, word, pos=wn_pos)
+        return sense.definition if sense else None
+    sense = lesk(context, word, pos=wn_pos)
+    return sense.definition() if sense else None
+
+def disambiguate(tokens, pos_tags, word_filter=is_content_word, window=WSD_WINDOW):
+    """Run lesk for the first occurrence of every tagged word that passes
+    ``word_filter``, as SenseInventory.disambiguate does.
+
+    Each word's context is the tokens within ``window`` positions of it (or
+    the whole message when window is None).  Results come from the shared
+    lesk_cache, keyed on (word, WordNet POS, context signature) because that
+    is all lesk looks at.  Pass ``word_filter=None`` to disambiguate every
+    token.
+    """
+    sliding = SlidingWindow(tokens, window) if window is not None else None
+    context = frozenset(tokens) if sliding is None else None
+    disambiguated, judged = {}, set()
+    for i, (word, tag) in enumerate(pos_tags):
+        if word in judged or (word_filter is not None and not word_filter(word, tag)):
+            continue
+        judged.add(word)
+        if sliding is not None:
+            context = frozenset(sliding.move_to(i))
+        definition = lesk_definition(context, word, get_wordnet_pos(tag))
+        if definition:
+            disambiguated[word] = definition
+    return disambiguated
 
 # Function for WSD + POS
-def process_input(user_input):
-    # Step 1: Correct spelling
-    corrected = correct_spelling(user_input)
+def analyze(user_input):
+    """Like process_input, but returns the Token list instead of the joined text"""
+    load()
+    if metrics.registry.enabled:
+        return _analyze_measured(user_input)
+    # Step 1: Tokenize once and correct spelling
+    tokens = tokenize(user_input)
+    words = [token.corrected for token in tokens]
     
-    # Step 2: Tokenize and POS tag
-    tokens = word_tokenize(corrected)
-    pos_tags = pos_tag(tokens)
+    # Step 2: POS tag
+    pos_tags = pos_tag(words)
     
     # Step 3: Word Sense Disambiguation
-    disambiguated = {}
-    for word, tag in pos_tags:
-        wn_pos = get_wordnet_pos(tag)
-        sense = lesk(tokens, word, pos=wn_pos)
-        if sense:
-            disambiguated[word] = sense.definition()
+    disambiguated = disambiguate(words, pos_tags)
     
+    return tokens, pos_tags, disambiguated
+
+def _analyze_measured(user_input):
+    """analyze() that records stage timings and counts in metrics.registry"""
+    registry, clock = metrics.registry, time.perf_counter
+    start = clock()
+    words = word_tokenize(user_input)
+    tokenized = clock()
+    tokens = _make_tokens(user_input, words)
+    corrected = [token.corrected for token in tokens]
+    spelled = clock()
+    pos_tags = pos_tag(corrected)
+    tagged = clock()
+
+    lesk_calls = 0
+    def counted(word, tag):
+        nonlocal lesk_calls
+        content = is_content_word(word, tag)
+        lesk_calls += content
+        return content
+
+    backend = wsd_index if wsd_index is not None else wordnet
+    examined = backend.examined if backend is not None else 0
+    cache_hits = lesk_cache.memory.hits + lesk_cache.disk_hits
+    disambiguated = disambiguate(corrected, pos_tags, word_filter=counted)
+    done = clock()
+
+    for stage, seconds in (('tokenize', tokenized - start), ('spelling', spelled - tokenized),
+                           ('pos_tag', tagged - spelled), ('lesk', done - tagged)):
+        registry.observe('stage_seconds', seconds, stage=stage)
+    registry.inc('messages_total')
+    registry.inc('tokens_total', len(words))
+    registry.inc('oov_corrected_total', sum(word != fixed for word, fixed in zip(words, corrected)))
+    registry.inc('lesk_calls_total', lesk_calls)
+    registry.inc('lesk_cache_hits_total', lesk_cache.memory.hits + lesk_cache.disk_hits - cache_hits)
+    if backend is not None:
+        registry.inc('synsets_examined_total', backend.examined - examined)
+    return tokens, pos_tags, disambiguated
+
+def process_input(user_input):
+    tokens, pos_tags, disambiguated = analyze(user_input)
+    corrected = ' '.join(token.corrected for token in tokens)
     return corrected, pos_tags, disambiguated
 
-# Response Generator
+# Batch version of process_input for log replays
+def process_batch(texts):
+    """Process many utterances; returns process_input results in order.
+
+    Each distinct text is analyzed once (repeated texts share one result),
+    spelling corrections and lesk results come from the shared caches, and
+    all sentences go through a single tagger instance.
+    """
+    load()
+    texts = list(texts)
+    unique = list(dict.fromkeys(texts))
+    word_lists = [[token.corrected for token in tokenize(text)] for text in unique]
+
+    analyzed = {}
+    for text, words, pos_tags in zip(unique, word_lists, pos_tag_sents(word_lists)):
+        analyzed[text] = (' '.join(words), pos_tags, disambiguate(words, pos_tags))
+    return [analyzed[text] for text in texts]
+
+# Parallel version of process_batch: chunks are sharded across worker processes
+# (CONTEXTBOT_WORKERS defaults to every core)
+PARALLEL_WORKERS = int(os.environ.get('CONTEXTBOT_WORKERS', '0')) or os.cpu_count()
+PARALLEL_CHUNKSIZE = int(os.environ.get('CONTEXTBOT_CHUNKSIZE', '256'))
+
+def init_worker():
+    """Pool initializer: load every resource once per worker, including NLTK's lazy WordNet"""
+    process_batch(["warm up the bank"])
+
+def process_parallel(texts, workers=PARALLEL_WORKERS, chunksize=PARALLEL_CHUNKSIZE):
+    """process_batch across a pool of ``workers`` processes; results in input order.
+
+    Each worker runs process_batch on ``chunksize`` utterances at a time, so
+    larger chunks share more tagger and lesk work but balance load less well.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    texts = list(texts)
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    workers = min(workers, len(chunks))
+    if workers <= 1:
+        return process_batch(texts)
+    with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+        return [result for batch in pool.map(process_batch, chunks) for result in batch]
+
+# Response Generator: rules from data/responses.json (or CONTEXTBOT_RESPONSES),
+# matched on whole tokens, first listed rule wins
+RESPONSES_PATH = os.environ.get('CONTEXTBOT_RESPONSES') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'responses.json')
+response_rules = None
+
 def generate_response(corrected, pos_tags, senses):
-    # Rule-based dummy responses
-    if "bank" in corrected:
-        meaning = senses.get("bank", "")
-        if "financial" in meaning or "money" in meaning:
-            return "Are you talking about a financial institution?"
-        elif "river" in meaning:
-            return "Oh! You mean a river bank. Sounds peaceful."
-        else:
-            return "Which type of bank are you referring to?"
-    
-    elif "book" in corrected:
-        return "Books are a great source of knowledge!"
-    
-    elif "love" in corrected:
-        return "Love is a beautiful emotion. Tell me more!"
-    
-    else:
-        return "Thanks for sharing! What else would you like to talk about?"
-
-# Main Chat Function
-def chatbot():
-    print("Hello! I'm your context-aware chatbot. Type 'exit' to quit.\n")
-    while True:
-        user_input = input("You: ")
-        if user_input.lower() == 'exit':
-            print("Bot: Goodbye!")
-            break
-        corrected, pos_tags, senses = process_input(user_input)
-        print(f"\n[Corrected]: {corrected}")
-        print(f"[POS Tags]: {pos_tags}")
-        print(f"[Word Senses]: {senses}")
-        response = generate_response(corrected, pos_tags, senses)
-        print(f"Bot: {response}\n")
-
-# Run chatbot
-chatbot()
\ No newline at end of file
+    global response_rules
+    if response_rules is None:
+        response_rules = rules.ResponseRules.load(RESPONSES_PATH)
+    return response_rules.respond([word for word, _ in pos_tags], senses)
+
+# The REPL and streaming mode live in cli.py; `python project.py` still starts them
+if __name__ == '__main__':
+    import cli
+    cli.main()
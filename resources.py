@@ -0,0 +1,204 @@
+"""Local provisioning of the NLTK data used by project.py.
+
+All resources live in one data directory (``CONTEXTBOT_NLTK_DATA``, falling
+back to ``nltk_data/`` next to this file).  A manifest in that directory
+records the size, mtime and sha256 of every resource, so a normal start only
+has to stat the files; the checksum is recomputed whenever the stat
+signature changes.  Missing resources are downloaded unless
+``CONTEXTBOT_OFFLINE=1`` is set, in which case a ResourceError tells the
+operator to run the preflight:
+
+    python resources.py            # fetch + verify everything, build indexes
+    python resources.py --offline  # verify only, never touch the network
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+
+DATA_DIR = os.environ.get('CONTEXTBOT_NLTK_DATA') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+MANIFEST_NAME = 'contextbot-manifest.json'
+OFFLINE = os.environ.get('CONTEXTBOT_OFFLINE', '') not in ('', '0')
+
+# NLTK package id -> location inside the data directory.  The *_tab/_eng
+# variants are what nltk 3.9 actually loads for word_tokenize/pos_tag.
+RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    'averaged_perceptron_tagger_eng': 'taggers/averaged_perceptron_tagger_eng',
+    'wordnet': 'corpora/wordnet',
+    'omw-1.4': 'corpora/omw-1.4',
+    'stopwords': 'corpora/stopwords',
+}
+
+_lock = threading.Lock()
+_ready = set()
+
+
+class ResourceError(RuntimeError):
+    """Raised when an NLTK resource is missing or fails verification."""
+
+
+def locate(name, data_dir=DATA_DIR):
+    """Return the on-disk path of a resource (directory or zip), or None"""
+    path = os.path.join(data_dir, *RESOURCES[name].split('/'))
+    if os.path.isdir(path):
+        return path
+    if os.path.isfile(path + '.zip'):
+        return path + '.zip'
+    return None
+
+
+def _walk(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            yield os.path.join(root, filename)
+
+
+def _signature(path):
+    """Cheap stat-based fingerprint: [files, bytes, newest mtime]"""
+    paths = list(_walk(path)) if os.path.isdir(path) else [path]
+    stats = [os.stat(p) for p in paths]
+    return [len(stats), sum(s.st_size for s in stats),
+            max((s.st_mtime_ns for s in stats), default=0)]
+
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for p in _walk(path):
+            digest.update(os.path.relpath(p, path).replace(os.sep, '/').encode('utf-8'))
+            digest.update(b'\0')
+            with open(p, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    else:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_manifest(data_dir):
+    try:
+        with open(os.path.join(data_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': 1, 'resources': {}}
+
+
+def _save_manifest(data_dir, manifest):
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _download(name, data_dir):
+    import nltk
+    os.makedirs(data_dir, exist_ok=True)
+    try:
+        ok = nltk.download(name, download_dir=data_dir, quiet=True, raise_on_error=True)
+    except (OSError, ValueError) as exc:
+        raise ResourceError(f"Could not download NLTK resource '{name}': {exc}") from exc
+    if not ok:
+        raise ResourceError(f"Could not download NLTK resource '{name}'")
+
+
+def _verify(name, path, data_dir, manifest, full=False):
+    """Check one resource against the manifest; return True if it changed"""
+    rel = os.path.relpath(path, data_dir).replace(os.sep, '/')
+    signature = _signature(path)
+    entry = manifest['resources'].get(name)
+    if entry and entry['path'] == rel and entry['signature'] == signature and not full:
+        return False
+    checksum = _checksum(path)
+    if entry and entry['path'] == rel and entry['sha256'] != checksum:
+        raise ResourceError(
+            f"Checksum mismatch for NLTK resource '{name}' at {path}; "
+            f"delete it and run 'python resources.py' to fetch a clean copy")
+    manifest['resources'][name] = {'path': rel, 'signature': signature, 'sha256': checksum}
+    return entry != manifest['resources'][name]
+
+
+def ensure_resources(names=None, data_dir=DATA_DIR, offline=OFFLINE, full=False):
+    """Make sure the given NLTK resources are present and intact.
+
+    Each resource is only checked once per process.  Missing resources are
+    downloaded unless ``offline`` is set; ``full`` forces checksums to be
+    recomputed even when the stat signature is unchanged.
+    """
+    names = list(RESOURCES) if names is None else list(names)
+    with _lock:
+        todo = [name for name in names if full or (data_dir, name) not in _ready]
+        if todo:
+            manifest = _load_manifest(data_dir)
+            changed = False
+            for name in todo:
+                path = locate(name, data_dir)
+                if path is None:
+                    if offline:
+                        raise ResourceError(
+                            f"NLTK resource '{name}' is missing from {data_dir}; "
+                            f"run 'python resources.py' on a networked machine first")
+                    _download(name, data_dir)
+                    path = locate(name, data_dir)
+                    if path is None:
+                        raise ResourceError(f"NLTK resource '{name}' not found after download")
+                    # A fresh copy: record its checksum instead of comparing
+                    # it with whatever copy was recorded before
+                    if manifest['resources'].pop(name, None) is not None:
+                        changed = True
+                changed |= _verify(name, path, data_dir, manifest, full=full)
+                _ready.add((data_dir, name))
+            if changed:
+                _save_manifest(data_dir, manifest)
+
+        import nltk
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+    return data_dir
+
+
+def wordnet_checksum(data_dir=DATA_DIR):
+    """sha256 of the verified WordNet corpus, used to key derived indexes"""
+    entry = _load_manifest(data_dir)['resources'].get('wordnet')
+    return entry['sha256'] if entry else None
+
+
+def preflight(data_dir=DATA_DIR, offline=False):
+    """Fetch anything missing, fully verify every resource and build indexes"""
+    ensure_resources(data_dir=data_dir, offline=offline, full=True)
+    manifest = _load_manifest(data_dir)
+    for name in RESOURCES:
+        print(f"{name:32} {manifest['resources'][name]['sha256'][:16]}  {locate(name, data_dir)}")
+
+    import lesk_index
+    path, checksum = lesk_index.index_path(data_dir), wordnet_checksum(data_dir)
+    if lesk_index.load(path, wordnet_checksum=checksum) is None:
+        print(f"building {path}")
+        lesk_index.build(path, wordnet_checksum=checksum)
+
+    import symspell
+    path = symspell.index_path(data_dir)
+    if symspell.load(path) is None:
+        print(f"building {path}")
+        symspell.build(path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch and verify the NLTK data used by ContextBot")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--offline', action='store_true', help="verify only, never download")
+    args = parser.parse_args()
+    try:
+        preflight(args.data_dir, offline=args.offline)
+    except ResourceError as exc:
+        sys.exit(f"error: {exc}")
@@ -0,0 +1,88 @@
+"""Data-driven response rules with token-keyed dispatch.
+
+A rule file is JSON:
+
+    {"default": "...",
+     "rules": [{"triggers": ["bank", "river bank"],
+                "sense": {"words": ["bank"], "contains": ["river"]},
+                "response": "..."}, ...]}
+
+A trigger is a token or a space-separated token sequence, matched against
+whole lowercased tokens ("bank" no longer fires on "embankment").  Rules are
+compiled into a table keyed on the first token of every trigger, so a
+message costs one dict lookup per token however many rules there are.  The
+optional sense condition holds when the definition chosen for the first of
+``words`` present in the senses contains one of the ``contains`` words.
+Rules without triggers are checked for every message.  When several rules
+match, the one listed first wins, as in an if/elif chain.
+"""
+import json
+import re
+from functools import lru_cache
+
+_WORD = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=4096)
+def _words(text):
+    return frozenset(_WORD.findall(text.lower()))
+
+
+class ResponseRules:
+    def __init__(self, spec):
+        self.default = spec.get('default', '')
+        self.responses = []
+        self.senses = []    # rule number -> (words, contains) or None
+        self.dispatch = {}  # first trigger token -> [(rule number, remaining tokens)]
+        self.always = []    # rule numbers without triggers
+        for number, rule in enumerate(spec['rules']):
+            self.responses.append(rule['response'])
+            sense = rule.get('sense')
+            self.senses.append((tuple(sense['words']), frozenset(w.lower() for w in sense['contains']))
+                               if sense else None)
+            triggers = rule.get('triggers', ())
+            for trigger in triggers:
+                first, *rest = trigger.lower().split()
+                self.dispatch.setdefault(first, []).append((number, tuple(rest)))
+            if not triggers:
+                self.always.append(number)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.responses)
+
+    def matches(self, tokens):
+        """Numbers of the rules whose triggers occur in ``tokens``, plus the trigger-less ones"""
+        words = [token.lower() for token in tokens]
+        get = self.dispatch.get
+        matched = set(self.always)
+        for i, word in enumerate(words):
+            entries = get(word)
+            if entries:
+                for number, rest in entries:
+                    if not rest or tuple(words[i + 1:i + 1 + len(rest)]) == rest:
+                        matched.add(number)
+        return matched
+
+    def _sense_holds(self, number, senses):
+        condition = self.senses[number]
+        if condition is None:
+            return True
+        words, contains = condition
+        for word in words:
+            definition = senses.get(word)
+            if definition:
+                return not contains.isdisjoint(_words(definition))
+        return False
+
+    def respond(self, tokens, senses=None):
+        """Response of the first listed rule that matches ``tokens`` and ``senses``"""
+        senses = senses or {}
+        for number in sorted(self.matches(tokens)):
+            if self._sense_holds(number, senses):
+                return self.responses[number]
+        return self.default
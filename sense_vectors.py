@@ -0,0 +1,127 @@
+"""Vectorized, IDF-weighted scoring backend for a SenseInventory.
+
+Every (lemma, sense) profile is a column and every context word a row of a
+sparse weight matrix stored as CSR arrays; a word's weight is its IDF over
+all sense profiles, so words shared by many senses count for less.  A batch
+of messages is encoded as (message, word) pairs and scored against all
+profiles at once: postings are gathered with NumPy fancy indexing and summed
+per (message, sense) with one bincount.  Unlike SenseInventory.disambiguate
+this is meant for scoring whole log files, not single chat messages.
+"""
+import math
+
+import numpy as np
+
+# Upper bound on the dense (messages x senses) score block built per chunk
+MAX_BLOCK_CELLS = 1 << 24
+
+
+class VectorSenseScorer:
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.lemmas = list(inventory.senses)
+        self.lemma_ids = {lemma: i for i, lemma in enumerate(self.lemmas)}
+        self.form_ids = {form: self.lemma_ids[lemma] for form, lemma in inventory.forms.items()}
+
+        # Senses of one lemma occupy the contiguous columns [start, start + count)
+        self.senses = [sense for lemma in self.lemmas for sense in inventory.senses[lemma]]
+        counts = np.array([len(inventory.senses[lemma]) for lemma in self.lemmas], dtype=np.int64)
+        self.sense_count = counts
+        self.sense_start = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        columns = {(sense.lemma, i): self.sense_start[self.lemma_ids[sense.lemma]] + i
+                   for lemma in self.lemmas for i, sense in enumerate(inventory.senses[lemma])}
+
+        # CSR postings: word -> (sense column, idf weight)
+        n_profiles = len(self.senses)
+        self.vocab = {}
+        indptr, cols, weights = [0], [], []
+        for word, by_lemma in inventory.index.items():
+            self.vocab[word] = len(self.vocab)
+            postings = [(lemma, i) for lemma, numbers in by_lemma.items() for i in numbers]
+            idf = math.log((1 + n_profiles) / (1 + len(postings))) + 1
+            for key in postings:
+                cols.append(columns[key])
+                weights.append(idf)
+            indptr.append(len(cols))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.cols = np.array(cols, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+
+    def encode(self, messages):
+        """Turn lowercase word lists into (message, word id) and (message, lemma id) arrays"""
+        vocab, form_ids = self.vocab, self.form_ids
+        term_msg, term_ids, pair_msg, pair_lemma = [], [], [], []
+        for m, words in enumerate(messages):
+            seen_lemmas = set()
+            for word in words:
+                lemma = form_ids.get(word)
+                if lemma is not None and lemma not in seen_lemmas:
+                    seen_lemmas.add(lemma)
+                    pair_msg.append(m)
+                    pair_lemma.append(lemma)
+            if seen_lemmas:
+                terms = {vocab[word] for word in words if word in vocab}
+                term_msg.extend([m] * len(terms))
+                term_ids.extend(terms)
+        as_array = lambda values: np.array(values, dtype=np.int64)
+        return as_array(term_msg), as_array(term_ids), as_array(pair_msg), as_array(pair_lemma)
+
+    def score_matrix(self, term_msg, term_ids, n_messages):
+        """Dense (n_messages x senses) IDF-weighted overlap scores"""
+        n_senses = len(self.senses)
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        total = int(lengths.sum())
+        # Positions of every posting of every (message, word) pair
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        keys = np.repeat(term_msg, lengths) * n_senses + self.cols[offsets]
+        scores = np.bincount(keys, weights=self.weights[offsets], minlength=n_messages * n_senses)
+        return scores.reshape(n_messages, n_senses)
+
+    def choose(self, scores, pair_msg, pair_lemma):
+        """Best sense column for each (message, lemma) pair; first listed sense wins ties"""
+        counts = self.sense_count[pair_lemma]
+        bounds = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        within = np.arange(int(counts.sum())) - np.repeat(bounds, counts)
+        columns = np.repeat(self.sense_start[pair_lemma], counts) + within
+        values = scores[np.repeat(pair_msg, counts), columns]
+        best = np.repeat(np.maximum.reduceat(values, bounds), counts)
+        first = np.minimum.reduceat(np.where(values == best, within, np.iinfo(np.int64).max), bounds)
+        return self.sense_start[pair_lemma] + first
+
+    def score_batch(self, messages):
+        """Disambiguate many messages (lists of lowercase words) at once.
+
+        Returns one {lemma: Sense} dict per message, lemmas in order of first
+        appearance.
+        """
+        messages = list(messages)
+        return self.score_encoded(len(messages), *self.encode(messages))
+
+    def score_encoded(self, n_messages, term_msg, term_ids, pair_msg, pair_lemma):
+        """score_batch() for arrays in the form encode() returns (see also columnar.py).
+
+        Both kinds of pairs are sorted by message and unique; (message,
+        lemma) pairs are in order of first appearance.
+        """
+        results = [{} for _ in range(n_messages)]
+        if not len(pair_msg):
+            return results
+
+        # Score in blocks so the dense score matrix stays bounded
+        block = max(1, MAX_BLOCK_CELLS // max(1, len(self.senses)))
+        for lo in range(0, n_messages, block):
+            hi = lo + block
+            t_lo, t_hi = np.searchsorted(term_msg, [lo, hi])
+            p_lo, p_hi = np.searchsorted(pair_msg, [lo, hi])
+            if p_lo == p_hi:
+                continue
+            scores = self.score_matrix(term_msg[t_lo:t_hi] - lo, term_ids[t_lo:t_hi], min(hi, n_messages) - lo)
+            chosen = self.choose(scores, pair_msg[p_lo:p_hi] - lo, pair_lemma[p_lo:p_hi])
+            for m, lemma, column in zip(pair_msg[p_lo:p_hi].tolist(), pair_lemma[p_lo:p_hi].tolist(),
+                                        chosen.tolist()):
+                results[m][self.lemmas[lemma]] = self.senses[column]
+        return results
+
+    def disambiguate(self, words):
+        return self.score_batch([words])[0]
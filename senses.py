@@ -0,0 +1,109 @@
+"""Sense inventory for context-based word sense disambiguation.
+
+Each ambiguous lemma has an ordered list of sense profiles (label, gloss and
+context words) loaded from data/senses.json.  An inverted index maps every
+context word to {lemma: sense numbers} it supports, and a message only looks
+up its own lemmas there, so a context word shared by many lemmas of a large
+inventory costs no more than one that is not.  The sense with the most
+context matches wins; ties go to the sense listed first.  With a window
+radius, each occurrence is scored against the words within that many
+positions of it instead (see windows.py).
+"""
+import json
+import os
+from collections import namedtuple
+
+from windows import SlidingWindow
+
+SENSES_PATH = os.environ.get('CONTEXTBOT_SENSES') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'senses.json')
+
+Sense = namedtuple('Sense', ['lemma', 'label', 'gloss', 'context'])
+
+
+class SenseInventory:
+    def __init__(self, inventory):
+        """``inventory`` maps lemma -> {"forms": [...], "senses": [{label, gloss, context}]}"""
+        self.senses = {}
+        self.forms = {}
+        self.index = {}
+        for lemma, entry in inventory.items():
+            senses = tuple(Sense(lemma, s['label'], s['gloss'], frozenset(s['context']))
+                           for s in entry['senses'])
+            self.senses[lemma] = senses
+            for form in [lemma] + list(entry.get('forms', ())):
+                self.forms[form] = lemma
+            for i, sense in enumerate(senses):
+                for word in sense.context:
+                    self.index.setdefault(word, {}).setdefault(lemma, []).append(i)
+
+    @classmethod
+    def load(cls, path=SENSES_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.senses)
+
+    def best(self, lemma, scores):
+        """Highest-scoring sense of ``lemma``; the first listed sense wins ties"""
+        senses = self.senses[lemma]
+        best = max(range(len(senses)), key=lambda i: scores.get((lemma, i), 0))
+        return senses[best]
+
+    def _add(self, scores, word, lemmas, step=1):
+        postings = self.index.get(word)
+        if postings:
+            for lemma in lemmas:
+                for i in postings.get(lemma, ()):
+                    key = (lemma, i)
+                    scores[key] = scores.get(key, 0) + step
+
+    def score(self, words, lemmas):
+        """Context match counts {(lemma, sense number): count} for ``lemmas``"""
+        scores = {}
+        for word in words:
+            self._add(scores, word, lemmas)
+        return scores
+
+    def occurrences(self, words, window, first_only=False):
+        """Yield (position, Sense) for every ambiguous word, using ±``window`` words of context.
+
+        With ``first_only`` only the first occurrence of each lemma is scored.
+        """
+        targets = [(i, self.forms[word]) for i, word in enumerate(words) if word in self.forms]
+        if first_only:
+            first = {}
+            for i, lemma in targets:
+                first.setdefault(lemma, i)
+            targets = [(i, lemma) for lemma, i in first.items()]
+        if not targets:
+            return
+        lemmas = list(dict.fromkeys(lemma for _, lemma in targets))
+        scores = {}
+        sliding = SlidingWindow(words, window, on_enter=lambda word: self._add(scores, word, lemmas),
+                                on_leave=lambda word: self._add(scores, word, lemmas, -1))
+        for i, lemma in targets:
+            sliding.move_to(i)
+            yield i, self.best(lemma, scores)
+
+    def disambiguate(self, words, window=None):
+        """Pick a sense for every ambiguous lemma in ``words`` (lowercase).
+
+        Returns {lemma: Sense} in order of first appearance.  With a
+        ``window`` radius the first occurrence of each lemma is judged by its
+        surrounding words only; otherwise the whole message is the context.
+        """
+        if window is not None:
+            return {sense.lemma: sense for _, sense in self.occurrences(words, window, first_only=True)}
+
+        context = set(words)
+        lemmas = {}
+        for word in words:
+            lemma = self.forms.get(word)
+            if lemma is not None:
+                lemmas.setdefault(lemma, None)
+        if not lemmas:
+            return {}
+        scores = self.score(context, lemmas)
+        return {lemma: self.best(lemma, scores) for lemma in lemmas}
@@ -0,0 +1,205 @@
+"""Long-running HTTP/JSON chat server for the project.py pipeline.
+
+    POST /chat    {"text": "...", "session": "optional id"}
+                  -> {"session", "corrected", "pos_tags", "senses", "response"}
+    GET  /health  -> {"status": "ok", "sessions": n}
+    GET  /metrics -> pipeline metrics in Prometheus text format (?format=json for JSON)
+
+Connections are handled on one asyncio event loop; the CPU-bound analysis
+is offloaded to a process pool whose workers load the tagger, WordNet and
+SpellChecker once, in the pool initializer.  With CONTEXTBOT_METRICS=1 each
+worker returns the metrics recorded for a message along with its result and
+the server adds them to its own registry.
+
+    python server.py --port 8080 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import metrics
+from cache import LRUCache
+
+MAX_BODY = 64 * 1024
+SESSION_TTL = 30 * 60
+# Seconds start() waits for the workers to load their resources
+WARMUP_TIMEOUT = 120
+
+
+def init_worker():
+    import project
+    project.init_worker()
+
+
+def ping():
+    time.sleep(0.01)  # long enough that one worker cannot answer every ping
+    return os.getpid()
+
+
+def analyze(text):
+    """Full analysis of one message, as returned by POST /chat"""
+    import project
+    corrected, pos_tags, senses = project.process_input(text)
+    result = {
+        'corrected': corrected,
+        'pos_tags': pos_tags,
+        'senses': senses,
+        'response': project.generate_response(corrected, pos_tags, senses),
+    }
+    if metrics.registry.enabled:
+        result['metrics'] = metrics.registry.snapshot(reset=True)
+    return result
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatServer:
+    def __init__(self, workers=None, executor=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor or ProcessPoolExecutor(self.workers, initializer=init_worker)
+        # session id -> number of messages seen; idle sessions expire
+        self.sessions = LRUCache(max_entries=100000, ttl=SESSION_TTL)
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Start every worker (so resources load up front), then listen"""
+        # Starting workers before accepting connections also keeps forked
+        # children from inheriting client sockets.  One concurrent ping per
+        # worker makes the pool start them all; a slow start is not fatal.
+        loop = asyncio.get_running_loop()
+        pings = asyncio.gather(*(loop.run_in_executor(self.executor, ping) for _ in range(self.workers)))
+        try:
+            await asyncio.wait_for(pings, WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"workers not ready after {WARMUP_TIMEOUT}s, listening anyway", file=sys.stderr)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """Serve requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                version, headers = 'HTTP/1.0', {}
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    headers = await self._read_headers(reader)
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY:
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method, path, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {'error': str(exc)}
+                except ValueError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {'error': "malformed request"}
+                except Exception:
+                    # Any other failure still gets a response instead of a dropped connection
+                    traceback.print_exc()
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "internal server error"}
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                self._write(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_headers(self, reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    def _write(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body)
+
+    async def dispatch(self, method, path, body):
+        path, _, query = path.partition('?')
+        if path == '/metrics':
+            if method != 'GET':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            if query == 'format=json':
+                return HTTPStatus.OK, metrics.registry.snapshot()
+            return HTTPStatus.OK, metrics.registry.prometheus()
+        if path == '/health':
+            if method != 'GET':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET")
+            return HTTPStatus.OK, {'status': 'ok', 'sessions': len(self.sessions)}
+        if path == '/chat':
+            if method != 'POST':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+            return HTTPStatus.OK, await self.chat(body)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {path}")
+
+    async def chat(self, body):
+        try:
+            request = json.loads(body or b'{}')
+            text = request['text']
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'expected a JSON object with a "text" field')
+        if not isinstance(text, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, '"text" must be a string')
+        session = str(request.get('session') or uuid.uuid4().hex)
+        self.sessions.put(session, self.sessions.get(session, 0) + 1)
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, analyze, text)
+        except Exception:
+            # Worker errors (even a ValueError) are the server's fault, not the client's
+            traceback.print_exc()
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "internal server error")
+        if 'metrics' in result:
+            metrics.registry.merge(result.pop('metrics'))
+        return dict(session=session, **result)
+
+
+async def serve(host, port, workers):
+    server = ChatServer(workers)
+    listener = await server.start(host, port)
+    print(f"serving on http://{host}:{port} with {server.workers} workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="ContextBot HTTP/JSON server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
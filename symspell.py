@@ -0,0 +1,384 @@
+"""Symmetric-delete spelling correction over pyspellchecker's dictionary.
+
+SpellChecker.correction() builds every string one edit away from an unknown
+word, and then every string one edit away from those (hundreds of thousands
+for an eight-letter word), looking each one up.  A symmetric-delete index
+(SymSpell) does that work once: every dictionary word is stored under each
+string obtained by deleting up to MAX_DISTANCE characters from its first
+PREFIX_LENGTH characters.  A query makes the same deletes of its own prefix
+(at most 29), looks them up and keeps the words found within one, else two,
+edits.  Each entry records how many characters were deleted from the word
+to reach its key, and a word one edit away always shares a key reached by at
+most one deletion on each side, so the common one-edit case only looks at
+the (at most 8) shallow deletes.  Candidates are ranked the way SpellChecker
+ranks them -- closest first, then most frequent, then alphabetically -- so
+the answers are the same.
+
+File layout (native byte order):
+
+    b'SYMSPEL1' | uint64 header length | pickled header | padding to 8 bytes
+    | uint32 word offsets[words + 1] | uint32 frequencies[words]
+    | uint8 lengths[words] | padding to 4 bytes | delete table | word table
+    | UTF-8 words
+
+where each table is
+
+    uint32 buckets[2 ** bits + 1] | uint32 keys[entries] | uint32 word ids[entries]
+
+Keys are CRC-32s (of the deletes, or of the words themselves), sorted, and
+``buckets`` indexes them by their top bits; a collision only adds candidates
+that the edit check drops.  In the delete table the top two bits of a word id
+hold the number of deletions.  Everything after the header is memory-mapped.
+
+    python symspell.py build [PATH]   # build from pyspellchecker's English dictionary
+    python symspell.py verify [PATH]  # compare with SpellChecker.correction on a fixed typo list
+"""
+import mmap
+import os
+import pickle
+import string
+import struct
+import sys
+import zlib
+from bisect import bisect_left
+
+from resources import DATA_DIR
+
+MAGIC = b'SYMSPEL1'
+LANGUAGE = 'en'
+PREFIX_LENGTH = 7
+MAX_DISTANCE = 2  # SpellChecker's default distance
+DELETE_BITS = 20  # bucket bits of the delete table (about 4M entries)
+WORD_BITS = 16    # and of the word table (about 160k)
+DEPTH_SHIFT = 30  # delete table ids: deletions << DEPTH_SHIFT | word id
+ID_MASK = (1 << DEPTH_SHIFT) - 1
+
+
+def index_path(data_dir=DATA_DIR):
+    """CONTEXTBOT_SYMSPELL_INDEX, or the index's place under ``data_dir``"""
+    return os.environ.get('CONTEXTBOT_SYMSPELL_INDEX') or os.path.join(data_dir, 'contextbot', 'symspell.bin')
+
+
+DEFAULT_PATH = index_path()
+
+
+def deletes(word, prefix_length=PREFIX_LENGTH, max_distance=MAX_DISTANCE):
+    """{string: deletions} for ``word[:prefix_length]`` and every string made
+    by deleting up to ``max_distance`` of its characters"""
+    frontier = {word[:prefix_length]}
+    found = dict.fromkeys(frontier, 0)
+    for depth in range(1, max_distance + 1):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        for text in frontier:
+            found.setdefault(text, depth)
+    return found
+
+
+def _key(text):
+    return zlib.crc32(text.encode('utf-8', 'surrogatepass'))
+
+
+def within_one(a, b):
+    """True if ``a`` and ``b`` are at most one insertion, deletion,
+    substitution or transposition of adjacent characters apart"""
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    i, n = 0, len(b)
+    while i < n and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    return (a[i + 1:] == b[i + 1:]
+            or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:]))
+
+
+def within_two(a, b):
+    """True if ``a`` and ``b`` are at most two such edits apart.
+
+    Past their common prefix, some shortest path of edits starts with one at
+    the first character of either string, so it is enough to try those (this
+    agrees with the Damerau-Levenshtein distance on every pair of strings of
+    up to six letters over three letters, and up to five over four).
+    """
+    if abs(len(a) - len(b)) > 2:
+        return False
+    i, n = 0, min(len(a), len(b))
+    while i < n and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    return (within_one(a[1:], b) or within_one(a, b[1:]) or within_one(a[1:], b[1:])
+            or (len(a) > 1 and within_one(a[1] + a[0] + a[2:], b))
+            or (len(b) > 1 and within_one(a, b[1] + b[0] + b[2:])))
+
+
+class _Table:
+    """Sorted CRC-32 keys with their word ids, bucketed by the top ``bits`` of the key"""
+
+    def __init__(self, view, start, bits, entries):
+        self.shift = 32 - bits
+        n_buckets = (1 << bits) + 1
+        self.buckets = view[start:start + 4 * n_buckets].cast('I')
+        start += 4 * n_buckets
+        self.keys = view[start:start + 4 * entries].cast('I')
+        start += 4 * entries
+        self.ids = view[start:start + 4 * entries].cast('I')
+        self.end = start + 4 * entries
+
+    def get(self, text):
+        """Ids stored under ``text`` (plus any CRC collisions)"""
+        key = _key(text)
+        keys, ids = self.keys, self.ids
+        bucket = key >> self.shift
+        hi = self.buckets[bucket + 1]
+        i = bisect_left(keys, key, self.buckets[bucket], hi)
+        while i < hi and keys[i] == key:
+            yield ids[i]
+            i += 1
+
+
+class SymSpell:
+    """Read-only view over an index file written by build(); answers like SpellChecker"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a SymSpell index")
+        (header_len,) = struct.unpack_from('Q', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = pickle.loads(self._mmap[start:start + header_len])
+        self.version = header['version']
+        self.language = header['language']
+        self.longest_word_length = header['longest']
+        self.prefix_length = header['prefix_length']
+        self.max_distance = header['max_distance']
+        n_words = header['words']
+
+        view = memoryview(self._mmap)
+        start = _align(start + header_len)
+        self._offsets = view[start:start + 4 * (n_words + 1)].cast('I')
+        start += 4 * (n_words + 1)
+        self.frequencies = view[start:start + 4 * n_words].cast('I')
+        start += 4 * n_words
+        self._lengths = view[start:start + n_words]
+        start = _align(start + n_words, 4)
+        self._deletes = _Table(view, start, *header['deletes'])
+        self._word_ids = _Table(view, self._deletes.end, *header['word_ids'])
+        self._words = view[self._word_ids.end:]
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def word(self, i):
+        return str(self._words[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+    def index(self, word):
+        """Id of the lowercased ``word``, or None if it is not in the dictionary"""
+        word = word.lower()
+        for i in self._word_ids.get(word):
+            if self.word(i) == word:
+                return i
+        return None
+
+    def __contains__(self, word):
+        return self.index(word) is not None
+
+    def __getitem__(self, word):
+        i = self.index(word)
+        return 0 if i is None else self.frequencies[i]
+
+    def _should_check(self, word):
+        # SpellChecker._check_if_should_check: punctuation marks, numbers
+        # and over-long words are never corrected
+        if len(word) == 1 and word in string.punctuation:
+            return False
+        if len(word) > self.longest_word_length + 3:
+            return False
+        if word.lower() == 'nan':
+            return True
+        try:
+            float(word)
+            return False
+        except ValueError:
+            return True
+
+    def candidates(self, word):
+        """Dictionary words closest to ``word``, at most max_distance edits away, as in SpellChecker"""
+        if word in self or not self._should_check(word):
+            return {word}
+        word = word.lower()
+        lengths = self._lengths
+        for distance, within in ((1, within_one), (2, within_two))[:self.max_distance]:
+            ids = set()
+            for text in deletes(word, self.prefix_length, distance):
+                ids.update(entry & ID_MASK for entry in self._deletes.get(text) if entry >> DEPTH_SHIFT <= distance)
+            found = set()
+            for i in ids:
+                if abs(lengths[i] - len(word)) <= distance:
+                    candidate = self.word(i)
+                    if within(word, candidate) and self._should_check(candidate):
+                        found.add(candidate)
+            if found:
+                return found
+        return None
+
+    def correction(self, word):
+        """Most probable spelling of ``word`` (None if nothing is close), as SpellChecker.correction"""
+        found = self.candidates(word)
+        if not found:
+            return None
+        return max(sorted(found), key=self.__getitem__)
+
+
+def _align(n, size=8):
+    return (n + size - 1) & ~(size - 1)
+
+
+def _build_table(keys, ids, bits):
+    """(buckets, sorted keys, ids) arrays for _Table"""
+    import numpy as np
+
+    entries = np.frombuffer(keys, dtype=np.uint32).astype(np.uint64) << np.uint64(32)
+    entries |= np.frombuffer(ids, dtype=np.uint32)
+    entries.sort()
+    sorted_keys = (entries >> np.uint64(32)).astype(np.uint32)
+    bounds = np.arange((1 << bits) + 1, dtype=np.uint64) << np.uint64(32 - bits)
+    buckets = np.searchsorted(sorted_keys, bounds).astype(np.uint32)
+    return buckets, sorted_keys, (entries & np.uint64(0xffffffff)).astype(np.uint32)
+
+
+def dictionary_version(language=LANGUAGE):
+    """Identifies the word-frequency dictionary an index is built from"""
+    from spellchecker import __version__
+    return f"pyspellchecker {__version__} {language}"
+
+
+def build(path=DEFAULT_PATH, language=LANGUAGE):
+    """Write an index of pyspellchecker's ``language`` dictionary to ``path``"""
+    from array import array
+    from spellchecker import SpellChecker
+
+    frequency = SpellChecker(language=language).word_frequency
+    words = sorted(frequency.dictionary)
+    encoded = [word.encode('utf-8') for word in words]
+    offsets = array('I', [0])
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    frequencies = array('I', (frequency.dictionary[word] for word in words))
+    lengths = bytes(min(len(word), 255) for word in words)
+
+    keys, ids = array('I'), array('I')
+    for i, word in enumerate(words):
+        found = {}
+        for text, depth in deletes(word).items():
+            key = _key(text)
+            found[key] = min(depth, found.get(key, depth))
+        keys.extend(found)
+        ids.extend(depth << DEPTH_SHIFT | i for depth in found.values())
+    tables = {'deletes': _build_table(keys, ids, DELETE_BITS),
+              'word_ids': _build_table(array('I', map(_key, words)), array('I', range(len(words))), WORD_BITS)}
+
+    header = pickle.dumps({
+        'version': dictionary_version(language),
+        'language': language,
+        'longest': frequency.longest_word_length,
+        'prefix_length': PREFIX_LENGTH,
+        'max_distance': MAX_DISTANCE,
+        'words': len(words),
+        'deletes': (DELETE_BITS, len(keys)),
+        'word_ids': (WORD_BITS, len(words)),
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('Q', len(header)))
+        f.write(header)
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        offsets.tofile(f)
+        frequencies.tofile(f)
+        f.write(lengths)
+        f.write(b'\0' * (_align(f.tell(), 4) - f.tell()))
+        for name in ('deletes', 'word_ids'):
+            for section in tables[name]:
+                f.write(section.tobytes())
+        f.write(b''.join(encoded))
+    os.replace(tmp, path)
+    return path
+
+
+def load(path=DEFAULT_PATH, language=LANGUAGE):
+    """Open the index at ``path``; None if it is missing or built from another dictionary"""
+    if not os.path.exists(path):
+        return None
+    index = SymSpell(path)
+    if index.version != dictionary_version(language):
+        return None
+    return index
+
+
+def typo_list(size=500, seed=0):
+    """Fixed list of misspellings: words of data/sample_chat.txt and of the
+    dictionary with one to three random edits, plus tokens SpellChecker
+    leaves alone"""
+    import random
+    from spellchecker import SpellChecker
+
+    rng = random.Random(seed)
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_chat.txt')
+    with open(sample, encoding='utf-8') as f:
+        words = sorted({word for line in f for word in line.split() if word.isalpha()})
+    words += sorted(rng.sample(sorted(SpellChecker(language=LANGUAGE).word_frequency.dictionary), size))
+    letters = string.ascii_lowercase
+    typos = ['42', '3.14', 'nan', '!', "don't", 'Helo', 'BANK', 'qzxv', 'x' * 60]
+    while len(typos) < size:
+        word = list(rng.choice(words))
+        for _ in range(rng.choice((1, 1, 2, 2, 3))):
+            i = rng.randrange(len(word) + 1)
+            edit = rng.choice(('insert', 'delete', 'replace', 'transpose'))
+            if edit == 'insert':
+                word.insert(i, rng.choice(letters))
+            elif edit == 'delete' and i < len(word) and len(word) > 1:
+                del word[i]
+            elif edit == 'replace' and i < len(word):
+                word[i] = rng.choice(letters)
+            elif edit == 'transpose' and i + 1 < len(word):
+                word[i], word[i + 1] = word[i + 1], word[i]
+        typos.append(''.join(word))
+    return typos
+
+
+def verify(index, typos):
+    """Compare index.correction with SpellChecker.correction; return the mismatches"""
+    from spellchecker import SpellChecker
+
+    spell = SpellChecker(language=index.language)
+    mismatches = []
+    for typo in typos:
+        expected, got = spell.correction(typo), index.correction(typo)
+        if expected != got or (typo in spell) != (typo in index):
+            mismatches.append((typo, expected, got))
+    return mismatches
+
+
+if __name__ == '__main__':
+    import time
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH
+    if command == 'build':
+        start = time.perf_counter()
+        build(path)
+        print(f"wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    elif command == 'verify':
+        mismatches = verify(SymSpell(path), typo_list())
+        for mismatch in mismatches:
+            print("MISMATCH", mismatch)
+        print(f"{len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    else:
+        sys.exit(f"unknown command {command!r}; expected build or verify")
@@ -0,0 +1,47 @@
+"""Sliding context windows for word sense disambiguation.
+
+Instead of the whole message, a target word is disambiguated against the
+tokens within ``radius`` positions of it.  The window keeps a count of every
+token inside it and is moved forward incrementally, so each token enters and
+leaves exactly once and the cost per target stays bounded however long the
+input is.
+"""
+
+
+class SlidingWindow:
+    """Distinct-token counts over items[center - radius : center + radius + 1].
+
+    ``on_enter(item)`` / ``on_leave(item)`` are called when an item's count
+    goes from zero to one and back, which lets callers maintain running
+    scores over the distinct words in the window.
+    """
+
+    def __init__(self, items, radius, on_enter=None, on_leave=None):
+        self.items = items
+        self.radius = radius
+        self.on_enter = on_enter
+        self.on_leave = on_leave
+        self.counts = {}
+        self._lo = 0
+        self._hi = 0
+
+    def move_to(self, center):
+        """Slide the window forward to ``center``; returns the live counts dict"""
+        items, counts = self.items, self.counts
+        lo = max(0, center - self.radius)
+        hi = min(len(items), center + self.radius + 1)
+        if lo < self._lo:
+            raise ValueError("SlidingWindow only moves forward")
+        for item in items[max(self._hi, lo):hi]:
+            n = counts.get(item, 0)
+            counts[item] = n + 1
+            if n == 0 and self.on_enter is not None:
+                self.on_enter(item)
+        for item in items[self._lo:min(lo, self._hi)]:
+            n = counts.pop(item) - 1
+            if n:
+                counts[item] = n
+            elif self.on_leave is not None:
+                self.on_leave(item)
+        self._lo, self._hi = lo, max(hi, self._hi)
+        return counts
@@ -0,0 +1,220 @@
+"""Lazy, per-POS partitioned reader for the WordNet database files.
+
+The first touch of nltk's WordNet reader parses the index files and
+exception lists of all four parts of speech, which takes seconds and tens
+of MB in every process.  This reader opens a partition (noun, verb, adj,
+adv) only when a lookup asks for that POS.  Its index file is sorted and
+its data file is addressed by synset offset, so both are memory-mapped and
+searched in place instead of being parsed up front.  The lemmas and synset
+records a process actually reaches are memoized as small tuples, and
+memory() reports what each loaded partition holds.
+
+It covers what Lesk needs, synsets(word) with their names and definitions,
+and gives the same answers as nltk's reader.
+
+    python wordnet_lite.py verify   # compare lesk with nltk on data/sample_chat.txt
+"""
+import mmap
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+
+from lesk_index import POS_LIST, Sense, morphy
+from resources import DATA_DIR, locate
+
+FILES = {'n': 'noun', 'v': 'verb', 'a': 'adj', 'r': 'adv'}
+
+# nltk's WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS
+SUBSTITUTIONS = {
+    'n': [('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'),
+          ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y')],
+    'v': [('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''),
+          ('ed', 'e'), ('ed', ''), ('ing', 'e'), ('ing', '')],
+    'a': [('er', ''), ('est', ''), ('er', 'e'), ('est', 'e')],
+    'r': [],
+}
+
+_SYNTACTIC_MARKER = re.compile(r'\(.*\)$')
+_EXAMPLE = re.compile(r'".*?"')
+
+# A parsed synset: name such as 'bank.n.01', pos ('s' for adjective
+# satellites) and definition
+Record = namedtuple('Record', ['name', 'pos', 'definition'])
+
+
+def _map(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _search(buf, key):
+    """The line of sorted ``buf`` whose first field is ``key``, or None.
+
+    The license header lines start with spaces, so they sort before every
+    lemma and need no special case.
+    """
+    key += b' '
+    lo, hi = 0, len(buf)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = buf.rfind(b'\n', 0, mid) + 1
+        end = buf.find(b'\n', start)
+        if end == -1:
+            end = len(buf)
+        line = buf[start:end]
+        if line.startswith(key):
+            return line
+        if line < key:
+            lo = end + 1
+        else:
+            hi = start
+    return None
+
+
+def _deep_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, (tuple, list)):
+        size += sum(_deep_size(item) for item in obj)
+    return size
+
+
+class Partition:
+    """One part of speech: index.<pos>, data.<pos> and <pos>.exc"""
+
+    def __init__(self, directory, pos):
+        self.pos = pos
+        name = FILES[pos]
+        self._index = _map(os.path.join(directory, 'index.' + name))
+        self._data = _map(os.path.join(directory, 'data.' + name))
+        self.exceptions = {}
+        exc_path = os.path.join(directory, name + '.exc')
+        if os.path.exists(exc_path):
+            with open(exc_path, encoding='utf-8') as f:
+                for line in f:
+                    terms = line.split()
+                    if terms:
+                        self.exceptions[terms[0]] = terms[1:]
+        self.lemmas = {}    # lemma -> synset offsets, for lemmas found so far
+        self.records = {}   # offset -> Record, for synsets read so far
+
+    def __contains__(self, lemma):
+        return bool(self.offsets(lemma))
+
+    def offsets(self, lemma):
+        """Synset offsets listed for ``lemma`` in the index; () if it is not there"""
+        found = self.lemmas.get(lemma)
+        if found is None:
+            line = _search(self._index, lemma.encode('utf-8'))
+            if line is None:
+                return ()  # misses are not memoized: typos would grow it without bound
+            fields = line.split()
+            n_synsets, n_pointers = int(fields[2]), int(fields[3])
+            first = 6 + n_pointers
+            found = self.lemmas[lemma] = tuple(int(f) for f in fields[first:first + n_synsets])
+        return found
+
+    def record(self, offset):
+        record = self.records.get(offset)
+        if record is None:
+            end = self._data.find(b'\n', offset)
+            columns, _, gloss = self._data[offset:end].decode('utf-8').partition('|')
+            fields = columns.split()
+            pos, lemma = fields[2], _SYNTACTIC_MARKER.sub('', fields[4]).lower()
+            # Like nltk, the name numbers the synset among its first lemma's senses
+            number = self.offsets(lemma).index(offset) + 1
+            definition = _EXAMPLE.sub('', gloss).strip().strip('; ')
+            record = self.records[offset] = Record(f"{lemma}.{pos}.{number:02d}", pos, definition)
+        return record
+
+    def memory(self):
+        """Bytes held by parsed lemmas, records and exceptions; the mapped file sizes"""
+        return {
+            'lemmas': len(self.lemmas),
+            'records': len(self.records),
+            'parsed_bytes': _deep_size(self.lemmas) + _deep_size(self.records) + _deep_size(self.exceptions),
+            'mapped_bytes': len(self._index) + len(self._data),
+        }
+
+
+class WordNetLite:
+    def __init__(self, directory):
+        self.directory = directory
+        self.partitions = {}
+        self._lock = threading.Lock()
+        self.examined = 0  # candidate synsets scored by lesk(), for metrics
+
+    def partition(self, pos):
+        """The Partition for ``pos`` ('s' shares the adjective files), opened on first use"""
+        pos = 'a' if pos == 's' else pos
+        partition = self.partitions.get(pos)
+        if partition is None:
+            with self._lock:
+                partition = self.partitions.get(pos)
+                if partition is None:
+                    partition = self.partitions[pos] = Partition(self.directory, pos)
+        return partition
+
+    def synsets(self, word, pos=None):
+        """Records for ``word``, like wn.synsets(word) restricted to ``pos``"""
+        word = word.lower()
+        found = []
+        for p in (POS_LIST if pos is None else (pos,)):
+            partition = self.partition(p)
+            p = partition.pos
+            for form in morphy(word, p, {p: partition}, {p: partition.exceptions}, SUBSTITUTIONS):
+                found.extend(partition.record(offset) for offset in partition.offsets(form))
+        if pos is not None:
+            found = [record for record in found if record.pos == pos]
+        return found
+
+    def lesk(self, context, word, pos=None):
+        """Same answer as nltk.wsd.lesk(context, word, pos), as a Sense or None"""
+        candidates = self.synsets(word, pos)
+        if not candidates:
+            return None
+        self.examined += len(candidates)
+        context = set(context)
+        # nltk breaks ties by comparing Synsets, i.e. by name
+        _, _, best = max((len(context.intersection(record.definition.split())), record.name, record)
+                         for record in candidates)
+        return Sense(best.name, best.definition)
+
+    def memory(self):
+        """Partition.memory() for every partition opened so far"""
+        return {FILES[pos]: partition.memory() for pos, partition in self.partitions.items()}
+
+
+def load(data_dir=DATA_DIR):
+    """A reader over the WordNet in ``data_dir``; None if it is not an unpacked directory"""
+    path = locate('wordnet', data_dir)
+    if path is None or not os.path.isdir(path):
+        return None
+    return WordNetLite(path)
+
+
+if __name__ == '__main__':
+    from lesk_index import verify
+    from resources import ensure_resources
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    if command != 'verify':
+        sys.exit(f"unknown command {command!r}; expected verify")
+    ensure_resources()
+    wordnet = load()
+    if wordnet is None:
+        sys.exit("no unpacked WordNet; run 'python resources.py' first")
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sample_chat.txt')
+    with open(sample, encoding='utf-8') as f:
+        sentences = [line.strip() for line in f if line.strip()]
+    mismatches = verify(wordnet, sentences)
+    for mismatch in mismatches:
+        print("MISMATCH", mismatch)
+    for name, usage in wordnet.memory().items():
+        print(f"{name:5} {usage['lemmas']:7} lemmas {usage['records']:7} records "
+              f"{usage['parsed_bytes'] / 1024:9.1f} KB parsed {usage['mapped_bytes'] / 1e6:6.1f} MB mapped")
+    print(f"{len(mismatches)} mismatches")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,119 @@
+"""Cache of lesk results shared by every message, and optionally by processes.
+
+lesk(context, word, pos) only depends on the lowercased word, the POS and
+the set of context tokens, so a result is stored under a 128-bit hash of
+exactly those.  When the Lesk index is available its vocabulary (every
+token of every definition) is passed as ``vocab``: context tokens outside it
+can never overlap a definition, so they are left out of the signature and
+near-identical sentences share entries.
+
+Entries live in a bounded LRUCache.  With a ``path`` (CONTEXTBOT_WSD_CACHE)
+they are also written to a SQLite database in WAL mode, which server and
+process-pool workers can share.  The database records the WordNet checksum
+it was filled from and is emptied when that changes.
+"""
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+
+from cache import LRUCache
+
+CACHE_PATH = os.environ.get('CONTEXTBOT_WSD_CACHE')
+MAX_ENTRIES = int(os.environ.get('CONTEXTBOT_WSD_CACHE_SIZE', '100000'))
+FLUSH_EVERY = 64  # new entries buffered before they are written to disk
+
+MISSING = object()
+
+
+def signature(word, pos, context, vocab=None):
+    """128-bit key of lesk(context, word, pos)"""
+    words = sorted(context if vocab is None else [token for token in context if token in vocab])
+    key = '\0'.join([word.lower(), pos or ''] + words)
+    return hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class WSDCache:
+    def __init__(self, max_entries=MAX_ENTRIES, path=CACHE_PATH, wordnet_checksum=None, vocab=None):
+        self.memory = LRUCache(max_entries)
+        self.path = path
+        self.wordnet_checksum = wordnet_checksum
+        self.vocab = vocab
+        self.disk_hits = 0
+        self._db = None
+        self._pid = None
+        self._pending = []
+        self._lock = threading.Lock()
+        if path:
+            atexit.register(self.flush)
+
+    def _connect(self):
+        # A connection must not cross fork(): a child opens its own and
+        # leaves the parent's unflushed entries to the parent
+        if self._db is None or self._pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+            db.execute('CREATE TABLE IF NOT EXISTS senses (key BLOB PRIMARY KEY, definition TEXT)')
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute("SELECT value FROM meta WHERE name = 'wordnet'").fetchone()
+            if row is None or row[0] != str(self.wordnet_checksum):
+                # Filled from other WordNet data (or new): start over
+                db.execute('DELETE FROM senses')
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('wordnet', ?)", (str(self.wordnet_checksum),))
+            db.execute('COMMIT')
+            self._db, self._pid, self._pending = db, os.getpid(), []
+        return self._db
+
+    def lookup(self, word, pos, context):
+        """(key, cached definition); the definition is MISSING when nothing is cached.
+
+        Pass the key to store() after computing the result.
+        """
+        key = signature(word, pos, context, self.vocab)
+        definition = self.memory.get(key, MISSING)
+        if definition is MISSING and self.path:
+            with self._lock:
+                row = self._connect().execute('SELECT definition FROM senses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                definition = row[0]
+                self.disk_hits += 1
+                self.memory.put(key, definition)
+        return key, definition
+
+    def store(self, key, definition):
+        self.memory.put(key, definition)
+        if self.path:
+            with self._lock:
+                self._connect()
+                self._pending.append((key, definition))
+                if len(self._pending) >= FLUSH_EVERY:
+                    self._flush()
+
+    def flush(self):
+        """Write buffered entries to the database"""
+        if self.path:
+            with self._lock:
+                self._flush()
+
+    def _flush(self):
+        if self._pending and self._pid == os.getpid():
+            self._db.execute('BEGIN IMMEDIATE')
+            self._db.executemany('INSERT OR REPLACE INTO senses VALUES (?, ?)', self._pending)
+            self._db.execute('COMMIT')
+            self._pending = []
+
+    def clear(self):
+        self.memory.clear()
+        if self.path:
+            with self._lock:
+                self._connect().execute('DELETE FROM senses')
+                self._pending = []
+
+    def stats(self):
+        stats = self.memory.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['disk_hits'] = self.disk_hits
+        stats['hit_rate'] = (stats['hits'] + self.disk_hits) / lookups if lookups else 0.0
+        return stats